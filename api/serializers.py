@@ -0,0 +1,55 @@
+from django.urls import reverse
+
+POST_FIELDS = (
+    "id",
+    "text",
+    "pub_date",
+    "author",
+    "group",
+    "image",
+    "comments_count",
+    "url",
+)
+
+# Model columns that can be left unread when their field isn't requested.
+DEFERRABLE = {"text": "text", "image": "image"}
+
+
+def requested_fields(request):
+    """Fields from ``?fields=a,b``, or all post fields."""
+    names = request.GET.get("fields")
+    if not names:
+        return POST_FIELDS
+    fields = tuple(
+        name for name in POST_FIELDS if name in set(names.split(","))
+    )
+    return fields or POST_FIELDS
+
+
+def deferred_columns(fields):
+    return [
+        column for name, column in DEFERRABLE.items() if name not in fields
+    ]
+
+
+def serialize_post(post, fields=POST_FIELDS):
+    values = {
+        "id": lambda: post.id,
+        "text": lambda: post.text,
+        "pub_date": lambda: post.pub_date.isoformat(),
+        "author": lambda: post.author.username,
+        "group": lambda: post.group.slug if post.group_id else None,
+        "image": lambda: post.image.url if post.image else None,
+        "comments_count": lambda: post.comments_count,
+        "url": lambda: reverse("post", args=[post.author.username, post.id]),
+    }
+    return {name: values[name]() for name in fields}
+
+
+def serialize_comment(comment):
+    return {
+        "id": comment.id,
+        "author": comment.author.username,
+        "text": comment.text,
+        "created": comment.created.isoformat(),
+    }
@@ -0,0 +1,130 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+
+
+@override_settings(TIMELINE_ASYNC=False, PER_PAGE=2)
+class ApiViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.reader = User.objects.create(username="reader")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f"Пост {i}", author=cls.author, group=cls.group
+            )
+            for i in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text="Комментарий"
+        )
+
+    def test_feeds_return_json(self):
+        """Ленты отдают посты в JSON, новые первыми"""
+        urls = (
+            reverse("api:index"),
+            reverse("api:group", args=[self.group.slug]),
+            reverse("api:profile", args=[self.author.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(
+                    [post["id"] for post in data["results"]],
+                    [self.posts[2].id, self.posts[1].id],
+                )
+                self.assertEqual(data["results"][0]["author"], "author")
+                self.assertEqual(data["results"][0]["group"], "group")
+
+    def test_feed_pages_by_cursor(self):
+        """Ссылки next и previous листают ленту курсором"""
+        first = self.client.get(reverse("api:index")).json()
+        second = self.client.get(first["next"]).json()
+        back = self.client.get(second["previous"]).json()
+
+        self.assertEqual(
+            [post["id"] for post in second["results"]], [self.posts[0].id]
+        )
+        self.assertIsNone(second["next"])
+        self.assertEqual(back["results"], first["results"])
+
+    def test_sparse_fields(self):
+        """Параметр fields ограничивает поля и не читает текст"""
+        url = reverse("api:index")
+        with self.assertNumQueries(1):
+            data = self.client.get(url, {"fields": "id,pub_date"}).json()
+        self.assertEqual(set(data["results"][0]), {"id", "pub_date"})
+        self.assertIn("?fields=id%2Cpub_date&after=", data["next"])
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся вместе с комментариями"""
+        post = self.posts[0]
+        data = self.client.get(reverse("api:post", args=[post.id])).json()
+        self.assertEqual(data["post"]["text"], post.text)
+        self.assertEqual(data["post"]["comments_count"], 1)
+        self.assertEqual(data["comments"][0]["author"], "reader")
+        self.assertIsNone(data["comments_next"])
+
+    @override_settings(COMMENTS_PER_PAGE=1)
+    def test_post_comments_page_by_cursor(self):
+        """Комментарии поста листаются ссылкой next"""
+        post = self.posts[1]
+        comments = [
+            Comment.objects.create(
+                post=post, author=self.reader, text=f"Комментарий {i}"
+            )
+            for i in range(2)
+        ]
+        data = self.client.get(reverse("api:post", args=[post.id])).json()
+        rest = self.client.get(data["comments_next"]).json()
+
+        self.assertEqual(data["comments"][0]["id"], comments[0].id)
+        self.assertEqual(
+            [comment["id"] for comment in rest["results"]], [comments[1].id]
+        )
+        self.assertIsNone(rest["next"])
+
+    def test_missing_objects_return_404(self):
+        """Несуществующие объекты возвращают 404 в JSON"""
+        urls = (
+            reverse("api:post", args=[10 ** 6]),
+            reverse("api:group", args=["missing"]),
+            reverse("api:profile", args=["missing"]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn("detail", response.json())
+
+    def test_follow_requires_login(self):
+        """Лента подписок без авторизации возвращает 401"""
+        response = self.client.get(reverse("api:follow_index"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_follow_feed(self):
+        """Лента подписок содержит посты авторов из подписок"""
+        reader = User.objects.create(username="follower")
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        data = self.client.get(reverse("api:follow_index")).json()
+        self.assertEqual(
+            [post["id"] for post in data["results"]],
+            [self.posts[2].id, self.posts[1].id],
+        )
+
+    def test_etag_not_modified(self):
+        """Повторный запрос с ETag получает 304 без чтения постов"""
+        url = reverse("api:index")
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Post.objects.create(text="Новый пост", author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,145 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import condition, require_safe
+
+from posts import feeds
+from posts.cache import feed_version
+from posts.models import Group, Post, User
+from posts.pagination import cursor_paginate, load_more
+from posts.timeline import follow_feed
+
+from .serializers import (
+    deferred_columns,
+    requested_fields,
+    serialize_comment,
+    serialize_post,
+)
+
+
+def feed_etag(request, *args, **kwargs):
+    """ETag from the feed version, so a 304 never reads post rows."""
+    key = f"{request.get_full_path()}|{request.user.pk}|{feed_version()}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def api_view(view):
+    return require_safe(condition(etag_func=feed_etag)(view))
+
+
+def not_found():
+    return JsonResponse({"detail": "Не найдено"}, status=404)
+
+
+def page_link(request, name, cursor):
+    if cursor is None:
+        return None
+    query = {
+        key: value
+        for key, value in request.GET.items()
+        if key not in ("after", "before")
+    }
+    query[name] = cursor
+    return f"{request.path}?{urlencode(query)}"
+
+
+def page_response(request, page, fields):
+    return JsonResponse(
+        {
+            "results": [serialize_post(post, fields) for post in page],
+            "next": page_link(request, "after", page.next_cursor),
+            "previous": page_link(request, "before", page.previous_cursor),
+        }
+    )
+
+
+def feed_response(request, posts):
+    fields = requested_fields(request)
+    posts = posts.for_feed(images=False).defer(*deferred_columns(fields))
+    _, page = cursor_paginate(
+        posts,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+    )
+    return page_response(request, page, fields)
+
+
+@api_view
+def index(request):
+    return feed_response(request, feeds.index_posts())
+
+
+@api_view
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return not_found()
+    return feed_response(request, feeds.group_posts(group))
+
+
+@api_view
+def profile(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return not_found()
+    return feed_response(request, feeds.author_posts(author))
+
+
+@api_view
+def post_detail(request, post_id):
+    post = (
+        Post.objects.select_related("author", "group")
+        .filter(pk=post_id)
+        .first()
+    )
+    if post is None:
+        return not_found()
+    comments, cursor = load_more(
+        post.comments.select_related("author"),
+        per_page=settings.COMMENTS_PER_PAGE,
+    )
+    next_link = None
+    if cursor is not None:
+        next_link = reverse("api:post_comments", args=[post_id])
+        next_link += f"?{urlencode({'after': cursor})}"
+    return JsonResponse(
+        {
+            "post": serialize_post(post, requested_fields(request)),
+            "comments": [serialize_comment(comment) for comment in comments],
+            "comments_next": next_link,
+        }
+    )
+
+
+@api_view
+def post_comments(request, post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return not_found()
+    comments, cursor = load_more(
+        post.comments.select_related("author"),
+        after=request.GET.get("after"),
+        per_page=settings.COMMENTS_PER_PAGE,
+    )
+    return JsonResponse(
+        {
+            "results": [serialize_comment(comment) for comment in comments],
+            "next": page_link(request, "after", cursor),
+        }
+    )
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"detail": "Требуется авторизация"}, status=401)
+    _, page = follow_feed(
+        request.user,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        images=False,
+    )
+    return page_response(request, page, requested_fields(request))
@@ -1,10 +1,21 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import matching_ids
 
 
-class PostAdmin(admin.ModelAdmin):
-    list_display = ("pk", "text", "pub_date", "author")
+class FullTextSearchMixin:
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return (
+            queryset.filter(pk__in=matching_ids(self.model, search_term)),
+            False,
+        )
+
+
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    list_display = ("pk", "text", "pub_date", "author", "comments_count")
     search_fields = ("text",)
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
@@ -23,7 +34,7 @@ class GroupAdmin(admin.ModelAdmin):
 admin.site.register(Group, GroupAdmin)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("text", "created", "author")
     search_fields = ("text",)
     list_filter = ("author",)
@@ -0,0 +1,70 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .replica import replica_state
+
+FEED_VERSION_KEY = "posts:feed_version"
+
+
+def feed_version():
+    # Pages read from the replica show the feed as of its last sync.
+    state = replica_state()
+    if state is not None:
+        return state[1]
+    return primary_feed_version()
+
+
+def primary_feed_version():
+    # A version lost to eviction restarts from the clock, past every
+    # version fragments may still be cached under.
+    return cache.get_or_set(FEED_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_feed_version():
+    """Move the feed version on, at once and when the transaction commits.
+
+    A replica synced in between records the first bump but may miss the
+    rows, so the second one tells it apart from the primary.
+    """
+
+    def bump():
+        try:
+            cache.incr(FEED_VERSION_KEY)
+        except ValueError:
+            cache.set(FEED_VERSION_KEY, time.time_ns(), timeout=None)
+
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def cached_count(feed, queryset):
+    """Size of a feed, counted once per feed version."""
+    return cache.get_or_set(
+        f"posts:count:{feed}:{feed_version()}", queryset.count
+    )
+
+
+def feed_cache_key(request, feed, *parts):
+    """Key a feed fragment by feed, page or cursor and version.
+
+    Fragments are shared by every viewer; the post cards inside them
+    don't depend on who is looking.
+    """
+    position = [
+        f"{name}={request.GET[name]}"
+        for name in ("page", "after", "before")
+        if name in request.GET
+    ]
+    return ":".join(
+        str(part)
+        for part in (
+            feed,
+            *parts,
+            *position,
+            feed_version(),
+        )
+    )
@@ -0,0 +1,65 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .page_cache import ALL, page_tags, replica_is_current, tag_versions
+
+
+def conditional_page(tags):
+    """Answer conditional GETs with an ETag built from the page's tags.
+
+    ``tags`` is the view's ``cached_page`` tags function. Every write a
+    page shows invalidates one of its tags, deletes and new comments
+    included, so the ETag only changes with the page. There is no
+    Last-Modified, as those writes have no timestamp to report.
+    Anonymous pages may be kept by a shared cache for PAGE_CACHE_MAX_AGE,
+    signed-in users' pages are revalidated on every request.
+    """
+
+    def etag(request, *args, **kwargs):
+        # A lagging replica may render a page older than the tags.
+        if not replica_is_current():
+            return None
+        found = page_tags(tags, request, *args, **kwargs)
+        if not found:
+            return None
+        versions = tag_versions([ALL, *found])
+        # Without a cache to keep them, tags can't tell a page changed.
+        if len(versions) <= len(found):
+            return None
+        key = "|".join(
+            str(part)
+            for part in (
+                request.get_full_path(),
+                request.user.pk,
+                *sorted(versions.items()),
+            )
+        )
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ("GET", "HEAD") and response.status_code in (
+                200,
+                304,
+            ):
+                if request.user.is_authenticated:
+                    patch_cache_control(response, private=True, no_cache=True)
+                else:
+                    patch_cache_control(
+                        response,
+                        public=True,
+                        max_age=settings.PAGE_CACHE_MAX_AGE,
+                    )
+            return response
+
+        return wrapper
+
+    return decorator
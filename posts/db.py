@@ -0,0 +1,86 @@
+import random
+import sqlite3
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+LOCKED_ERRORS = (OperationalError, sqlite3.OperationalError)
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    # A raw cursor, so the pragmas aren't counted as the request's queries.
+    cursor = connection.connection.cursor()
+    try:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+    finally:
+        cursor.close()
+
+
+def is_locked(error):
+    return "locked" in str(error)
+
+
+def retry_locked(func, *args, **kwargs):
+    """Call ``func``, retrying with jittered exponential backoff while
+    SQLite reports the database as locked.
+
+    The busy timeout can't help a transaction that read before writing:
+    in WAL mode SQLite fails it at once rather than deadlock, and only
+    running it again succeeds.
+    """
+    delay = settings.SQLITE_WRITE_BACKOFF
+    for attempt in range(settings.SQLITE_WRITE_RETRIES + 1):
+        try:
+            return func(*args, **kwargs)
+        except LOCKED_ERRORS as error:
+            if not is_locked(error) or (
+                attempt == settings.SQLITE_WRITE_RETRIES
+            ):
+                raise
+        time.sleep(random.uniform(delay / 2, delay))
+        delay *= 2
+
+
+def retry_atomic(func, *args, **kwargs):
+    """Call ``func`` in a transaction that is retried while locked.
+
+    A retry runs ``func`` again, so it should only do database work.
+    Inside an outer transaction a retry would only roll back to a
+    savepoint and hit the same lock, so there ``func`` runs once.
+    """
+
+    def attempt():
+        with transaction.atomic():
+            return func(*args, **kwargs)
+
+    if transaction.get_connection().in_atomic_block:
+        return attempt()
+    return retry_locked(attempt)
+
+
+def retry_save(instance, save=None):
+    """Save ``instance``, or call ``save``, with retry_atomic.
+
+    A new row takes a fresh id on every attempt: the one a rolled back
+    attempt got may be taken by another writer meanwhile.
+    """
+    adding = instance._state.adding
+
+    def attempt():
+        if adding:
+            instance.pk = None
+            instance._state.adding = True
+        return (save or instance.save)()
+
+    return retry_atomic(attempt)
@@ -0,0 +1,105 @@
+import csv
+import json
+import zlib
+
+from django.conf import settings
+
+from .models import Group, User
+
+# CSV columns; together they cover every row type import_yatube reads.
+FIELDS = (
+    "type",
+    "id",
+    "username",
+    "title",
+    "slug",
+    "description",
+    "author",
+    "group",
+    "text",
+    "pub_date",
+    "image",
+)
+FORMATS = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def export_rows(posts):
+    """Yield import_yatube rows for ``posts``, preceded by their authors
+    and groups so the export can be imported on its own."""
+    posts = posts.order_by("pk")
+    for pk, username in User.objects.filter(
+        pk__in=posts.values("author")
+    ).values_list("pk", "username"):
+        yield {"type": "user", "id": pk, "username": username}
+    for group in Group.objects.filter(pk__in=posts.values("group")).values(
+        "id", "title", "slug", "description"
+    ):
+        yield {"type": "group", **group}
+    rows = posts.values_list(
+        "pk", "author_id", "group_id", "text", "pub_date", "image"
+    ).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    for pk, author_id, group_id, text, pub_date, image in rows:
+        yield {
+            "type": "post",
+            "id": pk,
+            "author": author_id,
+            "group": group_id,
+            "text": text,
+            "pub_date": pub_date.isoformat(),
+            "image": image or None,
+        }
+
+
+def as_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+class _Line:
+    def write(self, value):
+        return value
+
+
+def as_csv(rows):
+    writer = csv.DictWriter(_Line(), FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def encode(lines, compress=False):
+    """Encode lines to UTF-8 bytes, gzipping them on the fly if asked.
+
+    Lines are joined into blocks of about EXPORT_BLOCK_SIZE bytes so the
+    response isn't written one tiny chunk per row.
+    """
+    gzip = zlib.compressobj(wbits=31) if compress else None
+    block = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        block.append(data)
+        size += len(data)
+        if size >= settings.EXPORT_BLOCK_SIZE:
+            data = b"".join(block)
+            yield gzip.compress(data) if gzip else data
+            block = []
+            size = 0
+    data = b"".join(block)
+    if gzip:
+        yield gzip.compress(data) + gzip.flush()
+    elif data:
+        yield data
+
+
+def export(posts, file_format="jsonl", compress=False):
+    rows = export_rows(posts)
+    lines = as_csv(rows) if file_format == "csv" else as_jsonl(rows)
+    return encode(lines, compress)
+
+
+def filename(name, file_format, compress):
+    return f"{name}.{file_format}" + (".gz" if compress else "")
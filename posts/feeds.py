@@ -0,0 +1,18 @@
+from .models import Post
+
+
+def index_posts():
+    return Post.objects.all()
+
+
+def group_posts(group):
+    return group.group_posts.all()
+
+
+def author_posts(author):
+    return author.author_posts.all()
+
+
+def followed_posts(user):
+    """The join-based follow feed, kept for numbered ``?page=`` links."""
+    return Post.objects.filter(author__following__user=user)
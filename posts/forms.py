@@ -1,6 +1,7 @@
 from django import forms
 
 from .models import Comment, Post
+from .thumbnails import schedule_images
 
 
 class PostForm(forms.ModelForm):
@@ -20,6 +21,25 @@ class PostForm(forms.ModelForm):
             "text": "Место для Вашего рассказа",
         }
 
+    def save_image(self):
+        """Store a new upload now, so saving the post doesn't write it."""
+        image = self.instance.image
+        if "image" in self.changed_data and image and not image._committed:
+            image.save(image.name, image.file, save=False)
+
+    def save(self, commit=True):
+        if commit and not self.instance._state.adding:
+            # An edit writes only the form's fields: comments_count is kept
+            # by F() updates, and the count read with the post may be old.
+            post = super().save(commit=False)
+            post.save(update_fields=[*self._meta.fields, "updated_at"])
+            self.save_m2m()
+        else:
+            post = super().save(commit)
+        if commit and post.image and "image" in self.changed_data:
+            schedule_images(post)
+        return post
+
 
 class CommentForm(forms.ModelForm):
     text = forms.CharField(widget=forms.Textarea, required=True)
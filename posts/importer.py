@@ -0,0 +1,340 @@
+import csv
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import bump_feed_version
+from .models import (
+    Comment,
+    Follow,
+    Group,
+    ImportCheckpoint,
+    ImportedId,
+    Post,
+    User,
+)
+from .page_cache import ALL, invalidate_pages
+from .stats import rebuild_author_stats, rebuild_comments_count
+from .timeline import rebuild_timeline
+
+# Kinds are written in this order within a chunk, so rows may refer to
+# objects from the same chunk or from earlier ones.
+KINDS = ("user", "group", "post", "comment", "follow")
+MODELS = {"user": User, "group": Group, "post": Post, "comment": Comment}
+
+
+class RowError(Exception):
+    pass
+
+
+def read_rows(path, kind=None):
+    """Yield ``(line, row)`` from a JSONL or CSV file, one at a time.
+
+    CSV rows take their kind from a ``type`` column or from ``kind``;
+    empty cells count as missing. Lines that aren't valid JSON are
+    yielded as a RowError.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            for line, row in enumerate(csv.DictReader(file), 1):
+                row = {key: value for key, value in row.items() if value}
+                if kind:
+                    row.setdefault("type", kind)
+                yield line, row
+            return
+        for line, text in enumerate(file, 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as error:
+                row = RowError(f"некорректный JSON: {error}")
+            yield line, row
+
+
+def rebuild_denormalized():
+    """Rebuild what signals keep up to date row by row, after bulk writes."""
+    rebuild_author_stats()
+    rebuild_comments_count()
+    rebuild_timeline()
+    bump_feed_version()
+    invalidate_pages(ALL)
+
+
+@contextmanager
+def original_dates():
+    """Keep imported publication dates instead of auto_now_add's now()."""
+    fields = [
+        Post._meta.get_field("pub_date"),
+        Comment._meta.get_field("created"),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _required(row, name):
+    if row.get(name) in (None, ""):
+        raise RowError(f"нет поля {name}")
+    return row[name]
+
+
+def _date(row, name):
+    if row.get(name) in (None, ""):
+        return timezone.now()
+    value = parse_datetime(str(row[name]))
+    if value is None:
+        raise RowError(f"некорректная дата в поле {name}")
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def _validate(obj, exclude):
+    try:
+        obj.clean_fields(exclude=exclude)
+    except ValidationError as error:
+        raise RowError(
+            "; ".join(
+                f"{name}: {' '.join(messages)}"
+                for name, messages in error.message_dict.items()
+            )
+        )
+
+
+class Importer:
+    """Write rows in chunks, one transaction per chunk.
+
+    Each chunk saves its objects with ``bulk_create``, the old-to-new id
+    map of its new objects and the source's checkpoint together, so an
+    interrupted import resumes after the last committed chunk. Signals
+    don't fire for bulk inserts; counters and the timeline are rebuilt by
+    the caller once the import is done.
+    """
+
+    def __init__(self, chunk_size=1000, on_error=None):
+        self.chunk_size = chunk_size
+        self.on_error = on_error or (lambda line, message: None)
+        self.ids = {}
+        self.imported = 0
+        self.skipped = 0
+
+    def run(self, source, rows):
+        """Import ``rows`` after the source's checkpoint.
+
+        Yields the last line of every committed chunk.
+        """
+        checkpoint = (
+            ImportCheckpoint.objects.filter(source=source)
+            .values_list("line", flat=True)
+            .first()
+            or 0
+        )
+        chunk = []
+        for line, row in rows:
+            if line <= checkpoint:
+                continue
+            chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                self.write(source, chunk)
+                yield line
+                chunk = []
+        if chunk:
+            self.write(source, chunk)
+            yield chunk[-1][0]
+
+    def write(self, source, chunk):
+        by_kind = {kind: [] for kind in KINDS}
+        for line, row in chunk:
+            if isinstance(row, RowError):
+                self.skip(line, row)
+            elif not isinstance(row, dict) or row.get("type") not in KINDS:
+                self.skip(line, RowError("неизвестный тип строки"))
+            else:
+                by_kind[row["type"]].append((line, row))
+
+        self.pending = {kind: {} for kind in MODELS}
+        with original_dates(), transaction.atomic():
+            # A write first takes SQLite's write lock for the whole chunk,
+            # so the site's own inserts wait and the ids build() reads back
+            # are the chunk's.
+            ImportCheckpoint.objects.filter(source=source).update(
+                line=chunk[-1][0]
+            )
+            for kind in KINDS:
+                if by_kind[kind]:
+                    getattr(self, f"write_{kind}s")(by_kind[kind])
+            ImportedId.objects.bulk_create(
+                ImportedId(kind=kind, old_id=old_id, new_id=new_id)
+                for kind, ids in self.pending.items()
+                for old_id, new_id in ids.items()
+            )
+            ImportCheckpoint.objects.update_or_create(
+                source=source, defaults={"line": chunk[-1][0]}
+            )
+        for kind, ids in self.pending.items():
+            self.id_map(kind).update(ids)
+
+    def skip(self, line, error):
+        self.skipped += 1
+        self.on_error(line, str(error))
+
+    def id_map(self, kind):
+        if kind not in self.ids:
+            self.ids[kind] = {
+                old_id: new_id
+                for old_id, new_id in ImportedId.objects.filter(
+                    kind=kind
+                ).values_list("old_id", "new_id")
+            }
+        return self.ids[kind]
+
+    def resolve(self, kind, old_id, required=True):
+        if old_id in (None, ""):
+            if required:
+                raise RowError(f"нет ссылки на {kind}")
+            return None
+        old_id = str(old_id)
+        new_id = self.pending[kind].get(old_id) or self.id_map(kind).get(
+            old_id
+        )
+        if new_id is None:
+            raise RowError(f"неизвестный {kind} {old_id}")
+        return new_id
+
+    def build(self, kind, rows, make, exclude):
+        """Insert validated objects and map their old ids to new ones.
+
+        The database assigns the ids; under the chunk's write lock they
+        follow the largest id before the insert, in insertion order.
+        """
+        model = MODELS[kind]
+        objects, old_ids, seen = [], [], set()
+        for line, row in rows:
+            try:
+                old_id = str(_required(row, "id"))
+                obj = make(row)
+                _validate(obj, exclude)
+                if (
+                    old_id in seen
+                    or old_id in self.pending[kind]
+                    or old_id in self.id_map(kind)
+                ):
+                    raise RowError(f"{kind} {old_id} уже импортирован")
+            except RowError as error:
+                self.skip(line, error)
+                continue
+            objects.append(obj)
+            old_ids.append(old_id)
+            seen.add(old_id)
+        top = model.objects.aggregate(top=Max("pk"))["top"] or 0
+        model.objects.bulk_create(objects)
+        new_ids = list(
+            model.objects.filter(pk__gt=top)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        self.pending[kind].update(zip(old_ids, new_ids))
+        self.imported += len(objects)
+
+    def map_existing(self, kind, rows, field):
+        """Reuse objects that already exist under the same natural key."""
+        model = MODELS[kind]
+        existing = dict(
+            model.objects.filter(
+                **{f"{field}__in": [row.get(field) for _, row in rows]}
+            ).values_list(field, "pk")
+        )
+        new_rows = []
+        seen = set()
+        for line, row in rows:
+            key = row.get(field)
+            if key in existing and row.get("id") is not None:
+                self.pending[kind][str(row["id"])] = existing[key]
+            elif key in seen:
+                self.skip(line, RowError(f"повторяется {field} {key}"))
+            else:
+                seen.add(key)
+                new_rows.append((line, row))
+        return new_rows
+
+    def write_users(self, rows):
+        self.build(
+            "user",
+            self.map_existing("user", rows, "username"),
+            lambda row: User(
+                username=_required(row, "username"),
+                first_name=row.get("first_name", ""),
+                last_name=row.get("last_name", ""),
+                email=row.get("email", ""),
+                password=make_password(None),
+            ),
+            exclude=["password", "last_login"],
+        )
+
+    def write_groups(self, rows):
+        self.build(
+            "group",
+            self.map_existing("group", rows, "slug"),
+            lambda row: Group(
+                title=_required(row, "title"),
+                slug=_required(row, "slug"),
+                description=row.get("description", ""),
+            ),
+            exclude=["updated_at"],
+        )
+
+    def write_posts(self, rows):
+        self.build(
+            "post",
+            rows,
+            lambda row: Post(
+                text=_required(row, "text"),
+                author_id=self.resolve("user", row.get("author")),
+                group_id=self.resolve("group", row.get("group"), False),
+                pub_date=_date(row, "pub_date"),
+                image=row.get("image") or None,
+            ),
+            exclude=["author", "group", "image", "updated_at"],
+        )
+
+    def write_comments(self, rows):
+        self.build(
+            "comment",
+            rows,
+            lambda row: Comment(
+                text=_required(row, "text"),
+                post_id=self.resolve("post", row.get("post")),
+                author_id=self.resolve("user", row.get("author")),
+                created=_date(row, "created"),
+            ),
+            exclude=["post", "author", "updated_at"],
+        )
+
+    def write_follows(self, rows):
+        follows = []
+        for line, row in rows:
+            try:
+                follow = Follow(
+                    user_id=self.resolve("user", row.get("user")),
+                    author_id=self.resolve("user", row.get("author")),
+                )
+            except RowError as error:
+                self.skip(line, error)
+                continue
+            if follow.user_id == follow.author_id:
+                self.skip(line, RowError("подписка на себя"))
+            else:
+                follows.append(follow)
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        self.imported += len(follows)
@@ -0,0 +1,89 @@
+import os
+import random
+import tempfile
+import time
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "filebased": "django.core.cache.backends.filebased.FileBasedCache",
+    "sqlite": "yatube.cache.SQLiteCache",
+}
+
+
+def _location(name, directory):
+    if name == "filebased":
+        return os.path.join(directory, "filebased")
+    if name == "sqlite":
+        return os.path.join(directory, "cache.sqlite3")
+    return name
+
+
+def _worker(name, directory, operations, keys, write_ratio, seed):
+    """Read-through workload: get, and set on a miss or a write."""
+    cache = import_string(BACKENDS[name])(
+        _location(name, directory), {"OPTIONS": {"MAX_ENTRIES": keys * 2}}
+    )
+    rng = random.Random(seed)
+    value = "x" * 512
+    hits = 0
+    for _ in range(operations):
+        key = f"bench:{rng.randrange(keys)}"
+        if rng.random() < write_ratio:
+            cache.set(key, value)
+        elif cache.get(key) is not None:
+            hits += 1
+        else:
+            cache.set(key, value)
+    return hits
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность get/set у LocMemCache, "
+        "FileBasedCache и SQLiteCache при разном числе процессов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes", type=int, nargs="+", default=[1, 4, 16]
+        )
+        parser.add_argument("--operations", type=int, default=5000)
+        parser.add_argument("--keys", type=int, default=1000)
+        parser.add_argument("--write-ratio", type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'backend':<11}{'processes':>10}{'ops/s':>12}{'hit rate':>10}"
+        )
+        for name in BACKENDS:
+            for processes in options["processes"]:
+                rate, hit_rate = self.run(name, processes, options)
+                self.stdout.write(
+                    f"{name:<11}{processes:>10}{rate:>12.0f}"
+                    f"{hit_rate:>10.1%}"
+                )
+
+    def run(self, name, processes, options):
+        operations = options["operations"]
+        with tempfile.TemporaryDirectory() as directory:
+            jobs = [
+                (
+                    name,
+                    directory,
+                    operations,
+                    options["keys"],
+                    options["write_ratio"],
+                    seed,
+                )
+                for seed in range(processes)
+            ]
+            with get_context("fork").Pool(processes) as pool:
+                start = time.perf_counter()
+                hits = pool.starmap(_worker, jobs)
+                elapsed = time.perf_counter() - start
+        total = operations * processes
+        return total / elapsed, sum(hits) / total
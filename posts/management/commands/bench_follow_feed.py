@@ -0,0 +1,125 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from posts.benchmark import percentile, timed
+from posts.models import Follow, Post, User
+from posts.pagination import cursor_paginate
+from posts.stats import rebuild_author_stats
+from posts.timeline import follow_feed, rebuild_timeline
+
+STRATEGIES = ("pull", "push", "hybrid")
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает задержки ленты подписок при чтении (pull), рассылке "
+        "(push) и гибридной стратегии. Данные создаются во временной "
+        "транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--followers", type=int, default=1000)
+        parser.add_argument("--authors", type=int, default=300)
+        parser.add_argument("--posts", type=int, default=10)
+        parser.add_argument("--threshold", type=int, default=500)
+        parser.add_argument("--samples", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.stdout.write(
+            f"{'scenario':<12}{'strategy':<10}{'operation':<8}"
+            f"{'p50, ms':>10}{'p99, ms':>10}"
+        )
+        for scenario in ("celebrity", "wide"):
+            for strategy in STRATEGIES:
+                for operation, timings in self.run(scenario, strategy):
+                    self.stdout.write(
+                        f"{scenario:<12}{strategy:<10}{operation:<8}"
+                        f"{percentile(timings, 0.5):>10.2f}"
+                        f"{percentile(timings, 0.99):>10.2f}"
+                    )
+
+    def run(self, scenario, strategy):
+        threshold = {
+            "pull": 0,
+            "push": 10 ** 9,
+            "hybrid": self.options["threshold"],
+        }[strategy]
+        random.seed(self.options["seed"])
+        with override_settings(
+            TIMELINE_ASYNC=False, TIMELINE_CELEBRITY_THRESHOLD=threshold
+        ), transaction.atomic():
+            readers, celebrity = getattr(self, f"seed_{scenario}")()
+            rebuild_author_stats()
+            if strategy != "pull":
+                rebuild_timeline()
+
+            def read():
+                reader = random.choice(readers)
+                if strategy == "pull":
+                    posts = Post.objects.filter(
+                        author__following__user=reader
+                    )
+                    list(cursor_paginate(posts)[1])
+                else:
+                    list(follow_feed(reader)[1])
+
+            results = [("read", timed(read, self.options["samples"]))]
+            if celebrity is not None:
+                results.append(
+                    (
+                        "write",
+                        timed(
+                            lambda: Post.objects.create(
+                                text="bench", author=celebrity
+                            ),
+                            max(1, self.options["samples"] // 10),
+                        ),
+                    )
+                )
+            transaction.set_rollback(True)
+        return results
+
+    def create_users(self, prefix, number):
+        User.objects.bulk_create(
+            User(username=f"bench_{prefix}_{i}") for i in range(number)
+        )
+        return list(
+            User.objects.filter(username__startswith=f"bench_{prefix}_")
+        )
+
+    def create_posts(self, authors):
+        Post.objects.bulk_create(
+            Post(text=f"bench {i}", author=author)
+            for author in authors
+            for i in range(self.options["posts"])
+        )
+
+    def seed_celebrity(self):
+        """Many readers follow one celebrity and a few ordinary authors."""
+        (celebrity,) = self.create_users("celebrity", 1)
+        authors = self.create_users("author", 50)
+        readers = self.create_users("reader", self.options["followers"])
+        self.create_posts([celebrity] + authors)
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author)
+            for reader in readers
+            for author in [celebrity] + random.sample(authors, 3)
+        )
+        return readers, celebrity
+
+    def seed_wide(self):
+        """A few readers each follow many ordinary authors."""
+        authors = self.create_users("author", self.options["authors"])
+        readers = self.create_users("reader", 5)
+        self.create_posts(authors)
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author)
+            for reader in readers
+            for author in authors
+        )
+        return readers, None
@@ -0,0 +1,138 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.db import LOCKED_ERRORS, apply_pragmas, retry_locked
+
+SCHEMA = (
+    "CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, "
+    "text TEXT, pub_date REAL)",
+    "CREATE INDEX post_author ON post (author_id, pub_date)",
+    "CREATE TABLE stats (author_id INTEGER PRIMARY KEY, posts_count INTEGER)",
+)
+AUTHORS = 100
+
+
+def _connect(path, tuned):
+    # Same connection settings as Django's SQLite backend.
+    db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    if tuned:
+        apply_pragmas(db, settings.SQLITE_PRAGMAS)
+    return db
+
+
+def _write(db, rng):
+    """Read, then write in one transaction, like a form save."""
+    author_id = rng.randrange(AUTHORS)
+    db.execute("BEGIN")
+    try:
+        db.execute(
+            "SELECT posts_count FROM stats WHERE author_id = ?", (author_id,)
+        ).fetchone()
+        db.execute(
+            "INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)",
+            (author_id, "x" * 200, time.time()),
+        )
+        db.execute(
+            "UPDATE stats SET posts_count = posts_count + 1 "
+            "WHERE author_id = ?",
+            (author_id,),
+        )
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+
+
+def _read(db, rng):
+    db.execute(
+        "SELECT id, text FROM post WHERE author_id = ? "
+        "ORDER BY pub_date DESC LIMIT 10",
+        (rng.randrange(AUTHORS),),
+    ).fetchall()
+
+
+def _worker(path, tuned, seconds, write_ratio, seed):
+    db = _connect(path, tuned)
+    rng = random.Random(seed)
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                if tuned:
+                    retry_locked(_write, db, rng)
+                else:
+                    _write(db, rng)
+            else:
+                _read(db, rng)
+            done += 1
+        except LOCKED_ERRORS:
+            errors += 1
+    db.close()
+    return done, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность SQLite со стандартными и "
+        "настроенными параметрами при смешанной нагрузке из нескольких "
+        "потоков и процессов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=3)
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'pragmas':<10}{'workers':<12}{'ops/s':>10}{'errors':>8}"
+        )
+        for tuned in (False, True):
+            for kind in ("threads", "processes"):
+                rate, errors = self.run(kind, tuned, options)
+                self.stdout.write(
+                    f"{'tuned' if tuned else 'default':<10}"
+                    f"{options['workers']} {kind:<10}"
+                    f"{rate:>10.0f}{errors:>8}"
+                )
+
+    def run(self, kind, tuned, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.sqlite3")
+            db = _connect(path, tuned)
+            for statement in SCHEMA:
+                db.execute(statement)
+            db.executemany(
+                "INSERT INTO stats VALUES (?, 0)",
+                [(i,) for i in range(AUTHORS)],
+            )
+            db.close()
+
+            jobs = [
+                (
+                    path,
+                    tuned,
+                    options["seconds"],
+                    options["write_ratio"],
+                    seed,
+                )
+                for seed in range(options["workers"])
+            ]
+            if kind == "threads":
+                with ThreadPoolExecutor(options["workers"]) as pool:
+                    results = list(pool.map(_worker, *zip(*jobs)))
+            else:
+                with get_context("fork").Pool(options["workers"]) as pool:
+                    results = pool.starmap(_worker, jobs)
+        done = sum(result[0] for result in results)
+        errors = sum(result[1] for result in results)
+        return done / options["seconds"], errors
@@ -0,0 +1,182 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.benchmark import percentile
+from posts.models import Group, Post, User
+from posts.pagination import encode_cursor
+
+VIEWS = (
+    "index",
+    "group_posts",
+    "profile",
+    "post_view",
+    "follow_index",
+    "add_comment",
+    "new_post",
+)
+# Views that need a logged-in user; the rest are read anonymously.
+AUTHENTICATED = {"follow_index", "add_comment", "new_post"}
+
+
+def _worker(requests):
+    """Send ``(user, method, path, data)`` requests, timing each one."""
+    client = Client()
+    timings = []
+    errors = 0
+    try:
+        for user, method, path, data in requests:
+            if user is not None:
+                client.force_login(user)
+            start = time.perf_counter()
+            response = getattr(client, method)(path, data)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+    finally:
+        connections.close_all()
+    return timings, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагружает основные страницы в несколько потоков или процессов и "
+        "выводит пропускную способность и p50/p95/p99 в JSON. Данные "
+        "готовит seed_load."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--views", nargs="+", choices=VIEWS, default=list(VIEWS)
+        )
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Запросов на страницу"
+        )
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--mode", choices=("threads", "processes"), default="threads"
+        )
+        parser.add_argument("--prefix", default="load")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--output", help="Файл для результатов, по умолчанию stdout"
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Отключить кэш страниц и фрагментов лент",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options["seed"])
+        prefix = options["prefix"]
+        self.users = list(
+            User.objects.filter(username__startswith=f"{prefix}_")[:1000]
+        )
+        self.groups = list(
+            Group.objects.filter(slug__startswith=f"{prefix}-").values_list(
+                "slug", flat=True
+            )
+        )
+        posts = list(
+            Post.objects.filter(author__username__startswith=f"{prefix}_")
+            .order_by("?")
+            .values_list("author__username", "pk", "pub_date")[:1000]
+        )
+        self.posts = [(username, pk) for username, pk, _ in posts]
+        self.cursors = [encode_cursor(date, pk) for _, pk, date in posts]
+        if not (self.users and self.groups and self.posts):
+            raise CommandError(
+                f"Нет данных с префиксом {prefix}, запустите seed_load"
+            )
+
+        results = {
+            "mode": options["mode"],
+            "concurrency": options["concurrency"],
+            "cache": not options["no_cache"],
+            "views": {},
+        }
+        # No debug toolbar or query log in the measurements.
+        measured = {"DEBUG": False}
+        if options["no_cache"]:
+            measured.update(PAGE_CACHE_TIMEOUT=0, FEED_CACHE_TIMEOUT=0)
+        with override_settings(**measured):
+            for view in options["views"]:
+                results["views"][view] = self.run(view)
+
+        report = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(report + "\n")
+        else:
+            self.stdout.write(report)
+
+    def request(self, view):
+        """A random request to ``view``: ``(user, method, path, data)``."""
+        user = (
+            self.random.choice(self.users) if view in AUTHENTICATED else None
+        )
+        if view == "index":
+            # The first page and ?after= cursors, as the site links them,
+            # and the numbered ?page= pages.
+            data = self.random.choice(
+                (
+                    {},
+                    {"after": self.random.choice(self.cursors)},
+                    {"page": self.random.randint(1, 5)},
+                )
+            )
+            return user, "get", reverse("index"), data
+        if view == "group_posts":
+            slug = self.random.choice(self.groups)
+            return user, "get", reverse("group", args=[slug]), {}
+        if view == "profile":
+            username = self.random.choice(self.posts)[0]
+            return user, "get", reverse("profile", args=[username]), {}
+        if view == "follow_index":
+            return user, "get", reverse("follow_index"), {}
+        username, post_id = self.random.choice(self.posts)
+        if view == "post_view":
+            path = reverse("post", args=[username, post_id])
+            return user, "get", path, {}
+        if view == "add_comment":
+            path = reverse("add_comment", args=[username, post_id])
+            return user, "post", path, {"text": "Нагрузочный комментарий"}
+        return user, "post", reverse("new_post"), {"text": "Нагрузочный пост"}
+
+    def run(self, view):
+        concurrency = self.options["concurrency"]
+        requests = [
+            self.request(view) for _ in range(self.options["requests"])
+        ]
+        jobs = [requests[i::concurrency] for i in range(concurrency)]
+        start = time.perf_counter()
+        if self.options["mode"] == "processes":
+            # Children must not share the parent's SQLite connections.
+            connections.close_all()
+            with get_context("fork").Pool(concurrency) as pool:
+                outcomes = pool.map(_worker, jobs)
+        else:
+            with ThreadPoolExecutor(concurrency) as executor:
+                outcomes = list(executor.map(_worker, jobs))
+        elapsed = time.perf_counter() - start
+
+        timings = [timing for outcome in outcomes for timing in outcome[0]]
+        return {
+            "requests": len(timings),
+            "errors": sum(outcome[1] for outcome in outcomes),
+            "seconds": round(elapsed, 3),
+            "throughput_rps": round(len(timings) / elapsed, 1),
+            "p50_ms": round(percentile(timings, 0.5), 2),
+            "p95_ms": round(percentile(timings, 0.95), 2),
+            "p99_ms": round(percentile(timings, 0.99), 2),
+        }
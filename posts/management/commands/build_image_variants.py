@@ -0,0 +1,73 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import generate_variants
+
+
+def _init_worker():
+    django.setup()
+
+
+def _generate(post_id):
+    try:
+        return post_id, generate_variants(post_id), None
+    except Exception as error:
+        return post_id, 0, error
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт адаптивные варианты изображений (JPEG и WebP) для постов, "
+        "параллельно на нескольких ядрах"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--chunk-size", type=int, default=8)
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Только посты, у которых ещё нет вариантов",
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image="").exclude(image__isnull=True)
+        if options["missing"]:
+            posts = posts.filter(image_variants__isnull=True)
+        post_ids = list(posts.order_by("pk").values_list("pk", flat=True))
+
+        # Forked workers must open their own database connections.
+        connections.close_all()
+
+        start = time.perf_counter()
+        images = variants = failed = 0
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=_init_worker
+        ) as pool:
+            results = pool.map(
+                _generate, post_ids, chunksize=options["chunk_size"]
+            )
+            for post_id, created, error in results:
+                if error is not None:
+                    failed += 1
+                    self.stderr.write(f"Пост {post_id}: {error}")
+                    continue
+                images += 1
+                variants += created
+        elapsed = time.perf_counter() - start
+
+        rate = images / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Изображений: {images}, вариантов: {variants}, "
+                f"ошибок: {failed} за {elapsed:.1f} с "
+                f"({rate:.1f} изображений/с, "
+                f"{options['workers']} процессов)"
+            )
+        )
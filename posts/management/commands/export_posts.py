@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import feeds
+from posts.export import FORMATS, export
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает посты автора или группы в JSONL или CSV в формате "
+        "import_yatube, не загружая их в память"
+    )
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument("--author", help="Имя пользователя автора")
+        source.add_argument("--group", help="Адрес (slug) группы")
+        parser.add_argument("--format", choices=FORMATS, default="jsonl")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument(
+            "--output", help="Файл для выгрузки, по умолчанию stdout"
+        )
+
+    def handle(self, *args, **options):
+        if options["author"]:
+            author = User.objects.filter(username=options["author"]).first()
+            if author is None:
+                raise CommandError("Автор не найден")
+            posts = feeds.author_posts(author)
+        else:
+            group = Group.objects.filter(slug=options["group"]).first()
+            if group is None:
+                raise CommandError("Группа не найдена")
+            posts = feeds.group_posts(group)
+
+        chunks = export(posts, options["format"], options["gzip"])
+        if not options["output"]:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            return
+        with open(options["output"], "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.importer import Importer, read_rows, rebuild_denormalized
+from posts.models import ImportCheckpoint
+from posts.search import index_suspended
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоково импортирует пользователей, группы, посты, комментарии и "
+        "подписки из JSONL или CSV. Каждая строка содержит поле type "
+        "(user, group, post, comment, follow), id со старой платформы и "
+        "поля объекта; ссылки (author, group, post, user) указывают на "
+        "старые id. Повторный запуск продолжает с последней сохранённой "
+        "порции. Пока идёт импорт, поиск не находит новые посты и "
+        "комментарии сайта: индекс перестраивается в конце."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+")
+        parser.add_argument(
+            "--type",
+            choices=["user", "group", "post", "comment", "follow"],
+            help="Тип строк CSV-файлов без колонки type",
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Начать файлы сначала, не продолжая прерванный импорт",
+        )
+
+    def handle(self, *args, **options):
+        path = None
+        importer = Importer(
+            chunk_size=options["chunk_size"],
+            on_error=lambda line, message: self.stderr.write(
+                f"{path}:{line}: {message}"
+            ),
+        )
+        start = time.perf_counter()
+        with index_suspended():
+            for path in options["paths"]:
+                source = os.path.abspath(path)
+                if options["restart"]:
+                    ImportCheckpoint.objects.filter(source=source).delete()
+                for line in importer.run(
+                    source, read_rows(path, options["type"])
+                ):
+                    self.stdout.write(
+                        f"{path}: строка {line}, "
+                        f"{self.rate(importer, start):.0f} строк/с"
+                    )
+            self.stdout.write("Пересчёт счётчиков и ленты подписок")
+            rebuild_denormalized()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Импортировано объектов: {importer.imported}, "
+                f"пропущено строк: {importer.skipped} за "
+                f"{time.perf_counter() - start:.1f} с "
+                f"({self.rate(importer, start):.0f} строк/с)"
+            )
+        )
+
+    def rate(self, importer, start):
+        elapsed = time.perf_counter() - start
+        rows = importer.imported + importer.skipped
+        return rows / elapsed if elapsed else 0
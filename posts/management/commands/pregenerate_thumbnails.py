@@ -0,0 +1,74 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.thumbnails import generate_thumbnails
+
+
+def _init_worker():
+    django.setup()
+
+
+def _generate(name):
+    try:
+        return name, generate_thumbnails(name), None
+    except Exception as error:
+        return name, 0, error
+
+
+class Command(BaseCommand):
+    help = (
+        "Заранее создаёт миниатюры для всех изображений в media/posts/, "
+        "параллельно на нескольких ядрах"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--chunk-size", type=int, default=8)
+
+    def handle(self, *args, **options):
+        directory = os.path.join(settings.MEDIA_ROOT, "posts")
+        names = (
+            sorted(
+                f"posts/{entry.name}"
+                for entry in os.scandir(directory)
+                if entry.is_file()
+            )
+            if os.path.isdir(directory)
+            else []
+        )
+
+        # Forked workers must open their own database connections.
+        connections.close_all()
+
+        start = time.perf_counter()
+        images = thumbnails = failed = 0
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=_init_worker
+        ) as pool:
+            results = pool.map(
+                _generate, names, chunksize=options["chunk_size"]
+            )
+            for name, created, error in results:
+                if error is not None:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+                    continue
+                images += 1
+                thumbnails += created
+        elapsed = time.perf_counter() - start
+
+        rate = images / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Изображений: {images}, миниатюр: {thumbnails}, "
+                f"ошибок: {failed} за {elapsed:.1f} с "
+                f"({rate:.1f} изображений/с, "
+                f"{options['workers']} процессов)"
+            )
+        )
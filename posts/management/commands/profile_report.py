@@ -0,0 +1,137 @@
+import os
+import pstats
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube.profiling import profile_token
+
+
+def label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def folded_stacks(stats):
+    """Approximate call stacks in the folded format flamegraph.pl reads.
+
+    cProfile only keeps caller-callee pairs, so a function's time is
+    split between its callers in proportion to the time each call edge
+    took; recursion is cut at the first repeated frame, which folds the
+    middleware chain into a single pass. Branches worth less than a
+    microsecond are dropped.
+    """
+    children = defaultdict(list)
+    roots = []
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        # The profiler's own disable() is the only built-in without one.
+        if not callers and func[0] != "~":
+            roots.append(func)
+        for caller, edge in callers.items():
+            children[caller].append((func, edge[3]))
+
+    stacks = defaultdict(float)
+
+    def walk(func, path, share):
+        own = stats.stats[func][2] * share
+        if own > 0:
+            stacks[";".join(label(frame) for frame in path)] += own
+        for child, edge_time in children[func]:
+            if child in path or share * edge_time < 1e-6:
+                continue
+            total = stats.stats[child][3]
+            walk(child, path + (child,), share * edge_time / total)
+
+    for root in roots:
+        walk(root, (root,), 1.0)
+    return [
+        f"{stack} {round(seconds * 1e6)}"
+        for stack, seconds in sorted(stacks.items())
+        if round(seconds * 1e6)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Объединяет профили запросов из PROFILE_DIR по представлениям: "
+        "выводит самые затратные функции и пишет стеки для flame graph"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "views", nargs="*", help="Имена URL, по умолчанию все"
+        )
+        parser.add_argument("--dir", default=None, help="Каталог профилей")
+        parser.add_argument(
+            "--sort", choices=("tottime", "cumulative"), default="tottime"
+        )
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument(
+            "--folded",
+            metavar="DIR",
+            help="Записать стеки каждого представления в DIR/<имя>.folded",
+        )
+        parser.add_argument(
+            "--token",
+            action="store_true",
+            help="Вывести значение заголовка, включающего профилирование",
+        )
+
+    def handle(self, *args, **options):
+        if options["token"]:
+            self.stdout.write(profile_token())
+            return
+
+        directory = options["dir"] or settings.PROFILE_DIR
+        if not os.path.isdir(directory):
+            raise CommandError(f"Нет каталога профилей {directory}")
+        available = sorted(os.listdir(directory))
+        missing = [view for view in options["views"] if view not in available]
+        if missing:
+            raise CommandError(
+                f"Нет профилей для {', '.join(missing)}; "
+                f"есть: {', '.join(available) or 'ничего'}"
+            )
+        views = options["views"] or available
+        if options["folded"]:
+            os.makedirs(options["folded"], exist_ok=True)
+
+        for view in views:
+            files = [
+                entry.path
+                for entry in os.scandir(os.path.join(directory, view))
+                if entry.name.endswith(".prof")
+            ]
+            if not files:
+                continue
+            stats = pstats.Stats(*files, stream=self.stdout)
+            self.report(view, len(files), stats, options)
+            if options["folded"]:
+                path = os.path.join(options["folded"], f"{view}.folded")
+                with open(path, "w") as file:
+                    file.writelines(
+                        line + "\n" for line in folded_stacks(stats)
+                    )
+
+    def report(self, view, requests, stats, options):
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"{view}: запросов {requests}, "
+                f"в среднем {stats.total_tt / requests * 1000:.1f} мс"
+            )
+        )
+        self.stdout.write(
+            f"{'calls':>10}{'tottime':>10}{'cumtime':>10}  function"
+        )
+        key = 2 if options["sort"] == "tottime" else 3
+        rows = sorted(
+            stats.stats.items(), key=lambda item: item[1][key], reverse=True
+        )
+        for func, (_, calls, tottime, cumtime, _) in rows[: options["limit"]]:
+            self.stdout.write(
+                f"{calls:>10}{tottime:>10.4f}{cumtime:>10.4f}  {label(func)}"
+            )
+        self.stdout.write("")
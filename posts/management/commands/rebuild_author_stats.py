@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import bump_feed_version
+from posts.page_cache import ALL, invalidate_pages
+from posts.stats import rebuild_author_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики постов и подписок всех пользователей"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = rebuild_author_stats(batch_size=options["batch_size"])
+        bump_feed_version()
+        invalidate_pages(ALL)
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересчитана статистика {total} авторов")
+        )
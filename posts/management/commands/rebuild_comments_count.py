@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import bump_feed_version
+from posts.page_cache import ALL, invalidate_pages
+from posts.stats import rebuild_comments_count
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает количество комментариев у всех постов"
+
+    def handle(self, *args, **options):
+        total = rebuild_comments_count()
+        bump_feed_version()
+        invalidate_pages(ALL)
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересчитаны комментарии {total} постов")
+        )
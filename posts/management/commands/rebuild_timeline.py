@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import bump_feed_version
+from posts.page_cache import ALL, invalidate_pages
+from posts.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = "Заново собирает ленты подписок всех пользователей"
+
+    def handle(self, *args, **options):
+        total = rebuild_timeline()
+        bump_feed_version()
+        invalidate_pages(ALL)
+        self.stdout.write(
+            self.style.SUCCESS(f"Восстановлено подписок: {total}")
+        )
@@ -0,0 +1,195 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts.importer import original_dates, rebuild_denormalized
+from posts.models import Comment, Follow, Group, Post, User
+from posts.search import index_suspended
+
+WORDS = (
+    "сегодня вчера кот собака город море лес книга фильм музыка код "
+    "работа отпуск погода кофе чай дорога поезд друг семья утро вечер"
+).split()
+
+
+def zipf_weights(number, alpha):
+    """Cumulative weights of ranked items: a few popular, a long tail."""
+    return list(accumulate(1 / (rank**alpha) for rank in range(1, number + 1)))
+
+
+def batches(objects, size):
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу пользователями, группами, постами, комментариями и "
+        "подписками со степенным распределением популярности авторов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument("--follows", type=int, default=20000)
+        parser.add_argument(
+            "--alpha",
+            type=float,
+            default=1.1,
+            help="Показатель степенного распределения популярности",
+        )
+        parser.add_argument("--prefix", default="load")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options["seed"])
+        prefix = options["prefix"]
+        if User.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(
+                f"Пользователи с префиксом {prefix}_ уже есть, "
+                f"задайте другой --prefix"
+            )
+
+        start = time.perf_counter()
+        with index_suspended(), original_dates():
+            users = self.create_users(prefix)
+            groups = self.create_groups(prefix)
+            # Authors and followers are ranked independently, so popular
+            # authors aren't always the most active readers.
+            authors = self.random.sample(users, len(users))
+            weights = zipf_weights(len(authors), options["alpha"])
+            posts = self.create_posts(authors, weights, groups)
+            self.create_comments(users, posts)
+            self.create_follows(users, authors, weights)
+            rebuild_denormalized()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано пользователей: {len(users)}, групп: {len(groups)}, "
+                f"постов: {len(posts)} за "
+                f"{time.perf_counter() - start:.1f} с"
+            )
+        )
+
+    def bulk_create(self, model, objects):
+        for batch in batches(objects, self.options["batch_size"]):
+            model.objects.bulk_create(batch)
+
+    def pub_date(self, now=None):
+        now = now or timezone.now()
+        return now - timedelta(seconds=self.random.randrange(365 * 86400))
+
+    def pick(self, items, weights):
+        return self.random.choices(items, cum_weights=weights)[0]
+
+    def text(self, words):
+        return " ".join(self.random.choices(WORDS, k=words)).capitalize()
+
+    def create_users(self, prefix):
+        self.bulk_create(
+            User,
+            (
+                User(username=f"{prefix}_{i}", password="!")
+                for i in range(self.options["users"])
+            ),
+        )
+        return list(
+            User.objects.filter(username__startswith=f"{prefix}_").values_list(
+                "pk", flat=True
+            )
+        )
+
+    def create_groups(self, prefix):
+        self.bulk_create(
+            Group,
+            (
+                Group(
+                    title=f"Группа {i}",
+                    slug=f"{prefix}-{i}",
+                    description=self.text(20),
+                )
+                for i in range(self.options["groups"])
+            ),
+        )
+        return list(
+            Group.objects.filter(slug__startswith=f"{prefix}-").values_list(
+                "pk", flat=True
+            )
+        )
+
+    def create_posts(self, authors, weights, groups):
+        """Most posts come from a few prolific authors."""
+        before = Post.objects.order_by("-pk").values_list("pk", flat=True)
+        last = before.first() or 0
+        group_weights = zipf_weights(len(groups), 1)
+        now = timezone.now()
+
+        def posts():
+            for _ in range(self.options["posts"]):
+                with_group = groups and self.random.random() < 0.7
+                yield Post(
+                    author_id=self.pick(authors, weights),
+                    group_id=(
+                        self.pick(groups, group_weights)
+                        if with_group
+                        else None
+                    ),
+                    text=self.text(self.random.randint(5, 80)),
+                    pub_date=self.pub_date(now),
+                )
+
+        self.bulk_create(Post, posts())
+        return list(
+            Post.objects.filter(pk__gt=last)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def create_comments(self, users, posts):
+        """Early posts, the most popular ones, collect most comments."""
+        if not posts:
+            return
+        weights = zipf_weights(len(posts), 0.8)
+        now = timezone.now()
+        self.bulk_create(
+            Comment,
+            (
+                Comment(
+                    post_id=self.pick(posts, weights),
+                    author_id=self.random.choice(users),
+                    text=self.text(self.random.randint(2, 30)),
+                    created=self.pub_date(now),
+                )
+                for _ in range(self.options["comments"])
+            ),
+        )
+
+    def create_follows(self, users, authors, weights):
+        """Followers per author follow a power law."""
+        pairs = set()
+        attempts = 0
+        while (
+            len(pairs) < self.options["follows"]
+            and attempts < self.options["follows"] * 10
+        ):
+            attempts += 1
+            user = self.random.choice(users)
+            author = self.pick(authors, weights)
+            if user != author:
+                pairs.add((user, author))
+        self.bulk_create(
+            Follow,
+            (Follow(user_id=user, author_id=author) for user, author in pairs),
+        )
@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.replica import sync_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную базу в реплику для чтения. С --loop повторяет "
+        "копирование каждые REPLICA_SYNC_INTERVAL секунд"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument(
+            "--interval", type=float, default=settings.REPLICA_SYNC_INTERVAL
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            elapsed = sync_replica()
+            self.stdout.write(
+                self.style.SUCCESS(f"Реплика обновлена за {elapsed:.2f} с")
+            )
+            if not options["loop"]:
+                return
+            time.sleep(max(0, options["interval"] - elapsed))
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+def fts_table(table):
+    return [
+        (
+            f"CREATE VIRTUAL TABLE {table}_fts USING fts5("
+            f"text, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61')"
+        ),
+        (
+            f"CREATE TRIGGER {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {table}_fts(rowid, text) VALUES (new.id, new.text); "
+            f"END"
+        ),
+        (
+            f"CREATE TRIGGER {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, text) "
+            f"VALUES ('delete', old.id, old.text); "
+            f"END"
+        ),
+        (
+            f"CREATE TRIGGER {table}_fts_au AFTER UPDATE OF text ON {table} "
+            f"BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, text) "
+            f"VALUES ('delete', old.id, old.text); "
+            f"INSERT INTO {table}_fts(rowid, text) VALUES (new.id, new.text); "
+            f"END"
+        ),
+        f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')",
+    ]
+
+
+def drop_fts_table(table):
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_fts_ai",
+        f"DROP TRIGGER IF EXISTS {table}_fts_ad",
+        f"DROP TRIGGER IF EXISTS {table}_fts_au",
+        f"DROP TABLE IF EXISTS {table}_fts",
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0010_timelineentry"),
+    ]
+
+    operations = [
+        migrations.RunSQL(fts_table(table), drop_fts_table(table))
+        for table in ("posts_post", "posts_comment")
+    ]
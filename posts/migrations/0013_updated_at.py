@@ -0,0 +1,56 @@
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+search_index = import_module('posts.migrations.0011_search_index')
+
+
+def recreate_fts(table):
+    # SQLite adds columns by rebuilding the table, which drops its triggers.
+    return search_index.drop_fts_table(table) + search_index.fts_table(table)
+
+
+def fill_updated_at(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Post.objects.update(updated_at=F('pub_date'))
+    Comment.objects.update(updated_at=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_imagevariant'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            migrations.RunSQL.noop,
+            recreate_fts('posts_post') + recreate_fts('posts_comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='date updated'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='date updated'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='date updated'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+        migrations.RunSQL(
+            recreate_fts('posts_post') + recreate_fts('posts_comment'),
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True)),
+                ('line', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImportedId',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=10)),
+                ('old_id', models.CharField(max_length=64)),
+                ('new_id', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='importedid',
+            constraint=models.UniqueConstraint(fields=('kind', 'old_id'), name='unique_imported_id'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.6 on 2026-10-18 05:42
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_updated_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_author_updated',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_group_updated',
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db import models
 from django.db.models import UniqueConstraint
 
@@ -13,11 +14,38 @@ class Group(models.Model):
     )
     slug = models.SlugField(max_length=40, unique=True)
     description = models.TextField(max_length=5000)
+    updated_at = models.DateTimeField("date updated", auto_now=True)
 
     def __str__(self):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    # Everything includes/post_item.html shows or keys its cache on.
+    FEED_FIELDS = (
+        "text",
+        "pub_date",
+        "updated_at",
+        "image",
+        "comments_count",
+        "author__username",
+        "group__title",
+        "group__slug",
+        "group__updated_at",
+    )
+
+    def for_feed(self, images=True):
+        """Posts ready to render as feed cards, in a fixed number of queries.
+
+        Authors and groups are joined in, only the columns the card shows
+        are read, and with ``images`` the image variants are prefetched.
+        """
+        posts = self.select_related("author", "group").only(*self.FEED_FIELDS)
+        if images:
+            posts = posts.prefetch_related("image_variants")
+        return posts
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name="Текст поста",
@@ -37,12 +65,26 @@ class Post(models.Model):
         null=True,
     )
     image = models.ImageField(upload_to="posts/", blank=True, null=True)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField("date updated", auto_now=True)
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_pub_date",
+            ),
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_pub_date",
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -61,6 +103,15 @@ class Comment(models.Model):
         help_text="Введите свой комментарий",
     )
     created = models.DateTimeField("date published", auto_now_add=True)
+    updated_at = models.DateTimeField("date updated", auto_now=True)
+
+    class Meta:
+        ordering = ["created", "id"]
+        indexes = [
+            models.Index(
+                fields=["post", "created"], name="comment_post_created"
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -78,3 +129,95 @@ class Follow(models.Model):
         constraints = [
             UniqueConstraint(fields=["user", "author"], name="unique_follow"),
         ]
+        indexes = [
+            models.Index(fields=["author", "user"], name="follow_author_user"),
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="timeline"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-pub_date"]
+        constraints = [
+            UniqueConstraint(fields=["user", "post"], name="unique_timeline"),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="timeline_user_pub_date",
+            ),
+        ]
+
+
+class ImageVariant(models.Model):
+    JPEG = "jpeg"
+    WEBP = "webp"
+    FORMAT_CHOICES = [(JPEG, "JPEG"), (WEBP, "WebP")]
+
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="image_variants"
+    )
+    name = models.CharField(max_length=255)
+    format = models.CharField(max_length=4, choices=FORMAT_CHOICES)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["width"]
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def url(self):
+        return default_storage.url(self.name)
+
+
+class ImportCheckpoint(models.Model):
+    """How many lines of an import_yatube source are already imported."""
+
+    source = models.CharField(max_length=255, unique=True)
+    line = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.source}:{self.line}"
+
+
+class ImportedId(models.Model):
+    """Maps an id from the old platform to the imported object's id."""
+
+    kind = models.CharField(max_length=10)
+    old_id = models.CharField(max_length=64)
+    new_id = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["kind", "old_id"], name="unique_imported_id"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.old_id}"
@@ -0,0 +1,301 @@
+import gzip
+import hashlib
+import os
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.db import transaction
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+
+from .cache import primary_feed_version
+from .models import Group, Post, User
+from .replica import replica_state
+
+# Every cached page carries this tag, so one invalidation drops them all.
+ALL = "all"
+# Lists of posts: anything shown on a post card changes these.
+FEED = "feed"
+# Directory of the static copies listing which pages carry each tag.
+TAGS_DIR = ".tags"
+STORED_HEADERS = (
+    "Content-Type",
+    "ETag",
+    "Last-Modified",
+    "Cache-Control",
+    "Vary",
+)
+
+
+def page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"pages:page:{path}"
+
+
+def tag_key(tag):
+    return f"pages:tag:{tag}"
+
+
+def tag_versions(tags):
+    """Current version of each tag, creating the ones that are missing.
+
+    Invalidation deletes a tag's version, so a page stored under the old
+    one never matches again, even if the tag is evicted from the cache.
+    """
+    keys = [tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+    if missing:
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def invalidate_pages(*tags):
+    """Drop the cached pages carrying any of ``tags``.
+
+    Runs at once and again when the transaction commits: a page rendered
+    from the old rows in between must not outlive the write.
+    """
+    tags = {str(tag) for tag in tags}
+
+    def invalidate():
+        cache.delete_many([tag_key(tag) for tag in tags])
+        if settings.PAGE_CACHE_STATIC_ROOT:
+            for tag in tags:
+                remove_static_pages(tag)
+
+    invalidate()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(invalidate)
+
+
+def post_tags(post):
+    """Pages that show ``post``: the feeds it is listed in and its page."""
+    return [
+        FEED,
+        f"post:{post.pk}",
+        f"author:{post.author_id}",
+        f"group:{post.group_id}",
+    ]
+
+
+def index_page_tags(request):
+    return [FEED]
+
+
+def group_page_tags(request, slug):
+    group = Group.objects.filter(slug=slug).values_list("pk", flat=True)
+    return [f"group:{pk}" for pk in group]
+
+
+def profile_page_tags(request, username):
+    user = User.objects.filter(username=username).values_list("pk", flat=True)
+    return [f"author:{pk}" for pk in user]
+
+
+def post_page_tags(request, username, post_id):
+    # The page shows the author's counters next to the post.
+    author = (
+        Post.objects.filter(author__username=username, id=post_id)
+        .order_by()
+        .values_list("author_id", flat=True)
+    )
+    return [
+        tag for pk in author for tag in (f"post:{post_id}", f"author:{pk}")
+    ]
+
+
+def replica_is_current():
+    state = replica_state()
+    return state is None or state[1] == primary_feed_version()
+
+
+def page_tags(tags, request, *args, **kwargs):
+    """``tags(request, ...)``, looked up once per request."""
+    if not hasattr(request, "_page_tags"):
+        request._page_tags = tags(request, *args, **kwargs)
+    return request._page_tags
+
+
+def cached_page(tags=None):
+    """Let PageCacheMiddleware keep the page for anonymous visitors.
+
+    ``tags`` returns the tags the page is invalidated by, or an empty
+    list when there is nothing to cache, such as a 404. Tag versions are
+    read before the page is rendered, so a write that lands meanwhile
+    invalidates it. A page read from the replica is kept only while the
+    replica has every write, that is its feed version is the primary's.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                not settings.PAGE_CACHE_TIMEOUT
+                or request.method != "GET"
+                or request.user.is_authenticated
+                or not replica_is_current()
+            ):
+                return view(request, *args, **kwargs)
+            found = page_tags(tags, request, *args, **kwargs) if tags else []
+            if tags and not found:
+                return view(request, *args, **kwargs)
+            versions = tag_versions([ALL, *found])
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                response.page_cache = (found, versions)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def accepts_gzip(request):
+    return "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+
+
+class PageCacheMiddleware:
+    """Serve anonymous visitors pages stored by ``cached_page`` views.
+
+    Sits before the session and auth middleware: a request without a
+    session or messages cookie is anonymous, and a hit skips everything
+    after this. Bodies are kept gzipped and sent as is to clients that
+    accept gzip.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PAGE_CACHE_TIMEOUT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ("GET", "HEAD") or any(
+            name in request.COOKIES
+            for name in (
+                settings.SESSION_COOKIE_NAME,
+                CookieStorage.cookie_name,
+            )
+        ):
+            return self.get_response(request)
+
+        key = page_key(request)
+        response = self.cached_response(request, key)
+        if response is not None:
+            return response
+        response = self.get_response(request)
+        if hasattr(response, "page_cache") and not response.cookies:
+            self.store(request, key, response)
+        return response
+
+    def cached_response(self, request, key):
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        versions, headers, body = entry
+        if cache.get_many(list(versions)) != versions:
+            return None
+
+        if accepts_gzip(request):
+            response = HttpResponse(body)
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(gzip.decompress(body))
+        for header, value in headers:
+            response[header] = value
+        response["Content-Length"] = len(response.content)
+        patch_vary_headers(response, ("Accept-Encoding",))
+        # Label the request for MetricsMiddleware as if it was served.
+        try:
+            request.resolver_match = resolve(request.path_info)
+        except Resolver404:
+            pass
+        return get_conditional_response(
+            request,
+            etag=response.get("ETag"),
+            last_modified=parse_http_date_safe(
+                response.get("Last-Modified", "")
+            ),
+            response=response,
+        )
+
+    def store(self, request, key, response):
+        tags, versions = response.page_cache
+        body = gzip.compress(response.content)
+        # Replayed with the Vary of the rendered page, Cookie included, so
+        # a shared cache never hands this copy to a signed-in user.
+        patch_vary_headers(response, ("Accept-Encoding",))
+        headers = [
+            (header, response[header])
+            for header in STORED_HEADERS
+            if response.has_header(header)
+        ]
+        cache.set(key, (versions, headers, body), settings.PAGE_CACHE_TIMEOUT)
+        if settings.PAGE_CACHE_STATIC_ROOT and not request.GET:
+            write_static_page(request.path, [ALL, *tags], response, body)
+
+
+def static_page_path(path):
+    """index.html for ``path`` under PAGE_CACHE_STATIC_ROOT, or None."""
+    try:
+        return safe_join(
+            settings.PAGE_CACHE_STATIC_ROOT, path.lstrip("/"), "index.html"
+        )
+    except SuspiciousFileOperation:
+        return None
+
+
+def write_file(path, content):
+    temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+
+def write_static_page(path, tags, response, body):
+    """Save the page, and its .gz for gzip_static, for a front proxy.
+
+    Each tag gets a list of the pages under it in TAGS_DIR, which
+    remove_static_pages reads to delete them.
+    """
+    target = static_page_path(path)
+    if target is None:
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    write_file(target, response.content)
+    write_file(f"{target}.gz", body)
+
+    tags_dir = os.path.join(settings.PAGE_CACHE_STATIC_ROOT, TAGS_DIR)
+    os.makedirs(tags_dir, exist_ok=True)
+    for tag in tags:
+        with open(os.path.join(tags_dir, tag), "a") as file:
+            file.write(f"{target}\n")
+
+
+def remove_static_pages(tag):
+    listing = os.path.join(settings.PAGE_CACHE_STATIC_ROOT, TAGS_DIR, tag)
+    # Taken out of the way first, so pages written from now on are listed
+    # in a new file and survive.
+    claimed = f"{listing}.{uuid.uuid4().hex}"
+    try:
+        os.rename(listing, claimed)
+    except FileNotFoundError:
+        return
+    with open(claimed) as file:
+        targets = set(file.read().splitlines())
+    os.remove(claimed)
+    for target in targets:
+        for name in (target, f"{target}.gz"):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,218 @@
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+class WindowedPaginator(Paginator):
+    """Numbered pages that don't list or count every page.
+
+    ``count`` is a callable giving the number of rows, such as a cached
+    or denormalized counter, used instead of ``COUNT(*)``. Each page gets
+    a ``window`` of up to PAGE_WINDOW page numbers around it to link to,
+    besides the first and last pages.
+    """
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_rows = count
+
+    @cached_property
+    def count(self):
+        if self.count_rows is not None:
+            return self.count_rows()
+        return super().count
+
+    def page_window(self, number):
+        size = settings.PAGE_WINDOW
+        start = max(1, min(number - size // 2, self.num_pages - size + 1))
+        return range(start, min(self.num_pages, start + size - 1) + 1)
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        page.window = self.page_window(page.number)
+        return page
+
+
+def encode_cursor(value, pk):
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    else:
+        value = repr(value)
+    return urlsafe_base64_encode(force_bytes(f"{value}|{pk}"))
+
+
+def decode_cursor(token, parse=parse_datetime):
+    try:
+        value, pk = force_str(urlsafe_base64_decode(token)).split("|")
+        value = parse(value)
+        pk = int(pk)
+    except (ValueError, TypeError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+def read_cursors(after=None, before=None, parse=parse_datetime):
+    """Return ``(cursor, newer)`` for the ``?after=``/``?before=`` tokens."""
+    if before:
+        cursor = decode_cursor(before, parse)
+        if cursor is not None:
+            return cursor, True
+    return (decode_cursor(after, parse) if after else None), False
+
+
+def _scan(queryset, cursor, newer, key, tiebreaker):
+    """Rows past ``cursor`` in scan order.
+
+    Older rows come newest first; ``newer`` rows come oldest first, from
+    the very oldest when there's no cursor.
+    """
+    if newer:
+        if cursor is not None:
+            value, pk = cursor
+            queryset = queryset.filter(
+                Q(**{f"{key}__gt": value})
+                | Q(**{key: value, f"{tiebreaker}__gt": pk})
+            )
+        return queryset.order_by(key, tiebreaker)
+    if cursor is not None:
+        value, pk = cursor
+        queryset = queryset.filter(
+            Q(**{f"{key}__lt": value})
+            | Q(**{key: value, f"{tiebreaker}__lt": pk})
+        )
+    return queryset.order_by(f"-{key}", f"-{tiebreaker}")
+
+
+def seek(queryset, cursor, newer, limit, key="pub_date", tiebreaker="id"):
+    """Read up to ``limit`` rows past ``cursor`` in scan order."""
+    return list(_scan(queryset, cursor, newer, key, tiebreaker)[:limit])
+
+
+def seek_each(
+    querysets, cursor, newer, limit, key="pub_date", tiebreaker="id"
+):
+    """Rows of several ``seek`` calls, read in one UNION ALL query.
+
+    Each queryset still reads at most ``limit`` rows from its own index;
+    the ``(key, tiebreaker)`` rows of all of them come in scan order.
+    """
+    if not querysets:
+        return []
+    parts, params = [], []
+    for queryset in querysets:
+        scan = _scan(
+            queryset.only(key, tiebreaker), cursor, newer, key, tiebreaker
+        )
+        sql, part_params = scan[:limit].query.sql_with_params()
+        parts.append(f"SELECT * FROM ({sql})")
+        params.extend(part_params)
+    rows = [
+        (getattr(row, key), getattr(row, tiebreaker))
+        for row in querysets[0].model.objects.raw(
+            " UNION ALL ".join(parts), params
+        )
+    ]
+    return sorted(rows, reverse=not newer)
+
+
+def make_page(rows, per_page, newer, has_cursor, cursor_of, item=None):
+    """Build a one-page window from ``per_page + 1`` rows read by seek."""
+    if newer:
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = True
+    else:
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = has_cursor
+
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(*cursor_of(rows[-1]))
+    if rows and has_previous:
+        previous_cursor = encode_cursor(*cursor_of(rows[0]))
+
+    if item is not None:
+        rows = [item(row) for row in rows]
+    paginator = Paginator(rows, per_page)
+    page = paginator.page(1)
+    page.next_cursor = next_cursor
+    page.previous_cursor = previous_cursor
+    return paginator, page
+
+
+def cursor_paginate(
+    queryset,
+    after=None,
+    before=None,
+    per_page=None,
+    key="pub_date",
+    tiebreaker="id",
+    item=None,
+):
+    """Keyset pagination over ``(key, tiebreaker)``, newest first.
+
+    Only ``per_page + 1`` rows are read per request and no ``COUNT(*)`` is
+    issued. The returned page is a one-page window with ``next_cursor`` and
+    ``previous_cursor`` tokens attached for ``?after=`` and ``?before=``.
+    ``item`` maps fetched rows to the objects the page should hold.
+    """
+    per_page = per_page or settings.PER_PAGE
+    cursor, newer = read_cursors(after, before)
+    rows = seek(queryset, cursor, newer, per_page + 1, key, tiebreaker)
+    return make_page(
+        rows,
+        per_page,
+        newer,
+        cursor is not None,
+        attrgetter(key, tiebreaker),
+        item,
+    )
+
+
+def load_more(queryset, after=None, per_page=None, key="created"):
+    """Oldest-first keyset pages for "load more" lists.
+
+    Returns a queryset of up to ``per_page`` rows after the ``after`` token
+    and the token for the next batch, or ``None`` when there's nothing
+    more. Whether there is more is only asked when the batch is full.
+    """
+    per_page = per_page or settings.PER_PAGE
+    cursor = decode_cursor(after) if after else None
+    rows = _scan(queryset, cursor, True, key, "id")[:per_page]
+    if len(rows) < per_page:
+        return rows, None
+    last = (getattr(rows[per_page - 1], key), rows[per_page - 1].pk)
+    if not _scan(queryset, last, True, key, "id").exists():
+        return rows, None
+    return rows, encode_cursor(*last)
+
+
+def paginate(request, queryset, per_page=None, count=None, **options):
+    """Paginate a feed: by cursor by default, by number for ``?page=``.
+
+    ``count`` returns the feed's size for numbered pages, see
+    WindowedPaginator.
+    """
+    per_page = per_page or settings.PER_PAGE
+    if "page" in request.GET:
+        paginator = WindowedPaginator(queryset, per_page, count)
+        page = paginator.get_page(request.GET.get("page"))
+        if options.get("item") is not None:
+            page.object_list = [options["item"](row) for row in page]
+        return paginator, page
+    return cursor_paginate(
+        queryset,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        per_page=per_page,
+        **options,
+    )
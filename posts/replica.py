@@ -0,0 +1,122 @@
+import sqlite3
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_STATE_KEY = "posts:replica_state"
+LAST_WRITE_COOKIE = "last_write"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_replica_state = ContextVar("replica_state", default=None)
+# Set by the router when the request writes to REPLICA_APPS.
+_wrote = ContextVar("wrote", default=False)
+
+
+def replica_state():
+    """``(synced_at, feed_version)`` of the replica this request reads,
+    or None when it reads the primary."""
+    return _replica_state.get()
+
+
+def copy_database(source, target, pages=-1):
+    """Copy one SQLite file over another with the online backup API."""
+    source_db = sqlite3.connect(source)
+    target_db = sqlite3.connect(target)
+    try:
+        source_db.backup(target_db, pages=pages)
+    finally:
+        target_db.close()
+        source_db.close()
+
+
+def sync_replica():
+    """Copy the primary onto the replica and publish when it was taken."""
+    from .cache import primary_feed_version
+
+    started_at = time.time()
+    version = primary_feed_version()
+    copy_database(
+        connections[DEFAULT_DB_ALIAS].settings_dict["NAME"],
+        connections[settings.REPLICA_DATABASE].settings_dict["NAME"],
+        pages=settings.REPLICA_BACKUP_PAGES,
+    )
+    cache.set(REPLICA_STATE_KEY, (started_at, version), timeout=None)
+    return time.time() - started_at
+
+
+class ReplicaRouter:
+    """Send reads of REPLICA_APPS to the replica while a request allows it."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            replica_state() is not None
+            and model._meta.app_label in settings.REPLICA_APPS
+        ):
+            return settings.REPLICA_DATABASE
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in settings.REPLICA_APPS:
+            _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != settings.REPLICA_DATABASE
+
+
+class ReplicaMiddleware:
+    """Let safe requests read from a fresh replica.
+
+    A replica is fresh if it was synced within REPLICA_MAX_LAG seconds.
+    Users who wrote something, with any method, read the primary until
+    the replica has been synced after their write, so they always see
+    their own posts, comments and follows.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = None
+        if request.method in SAFE_METHODS:
+            state = self.fresh_state(request)
+        token = _replica_state.set(state)
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _wrote.reset(wrote_token)
+            _replica_state.reset(token)
+
+        if (
+            wrote or request.method not in SAFE_METHODS
+        ) and response.status_code < 400:
+            response.set_cookie(
+                LAST_WRITE_COOKIE,
+                str(time.time()),
+                max_age=settings.REPLICA_MAX_LAG,
+                httponly=True,
+            )
+        return response
+
+    def fresh_state(self, request):
+        state = cache.get(REPLICA_STATE_KEY)
+        if state is None:
+            return None
+        synced_at = state[0]
+        if time.time() - synced_at > settings.REPLICA_MAX_LAG:
+            return None
+        try:
+            last_write = float(request.COOKIES.get(LAST_WRITE_COOKIE, 0))
+        except ValueError:
+            last_write = time.time()
+        if synced_at <= last_write:
+            return None
+        return state
@@ -0,0 +1,127 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, Post
+from .pagination import make_page, read_cursors
+
+INDEXES = {
+    Post: "posts_post_fts",
+    Comment: "posts_comment_fts",
+}
+
+RELATED = {
+    Comment: ("author", "post__author"),
+}
+
+
+def match_expression(query):
+    """Turn user input into an FTS5 query of quoted prefix terms."""
+    terms = query.split()
+    return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def matching_ids(model, query):
+    """Subquery of ids matching ``query``, for ``filter(pk__in=...)``."""
+    return RawSQL(
+        f"SELECT rowid FROM {INDEXES[model]} "
+        f"WHERE {INDEXES[model]} MATCH %s",
+        (match_expression(query),),
+    )
+
+
+def _ranked_ids(model, match, cursor, newer, limit):
+    table = INDEXES[model]
+    sql = (
+        f"SELECT id, score FROM (SELECT rowid AS id, bm25({table}) AS score "
+        f"FROM {table} WHERE {table} MATCH %s)"
+    )
+    params = [match]
+    if cursor is not None:
+        operator = "<" if newer else ">"
+        sql += (
+            f" WHERE score {operator} %s OR (score = %s AND id {operator} %s)"
+        )
+        params += [cursor[0], cursor[0], cursor[1]]
+    order = "DESC" if newer else "ASC"
+    sql += f" ORDER BY score {order}, id {order} LIMIT %s"
+    params.append(limit)
+    with connection.cursor() as db:
+        db.execute(sql, params)
+        return db.fetchall()
+
+
+def search(model, query, after=None, before=None, per_page=None):
+    """Page through ``model`` rows matching ``query``, best bm25 first."""
+    per_page = per_page or settings.PER_PAGE
+    match = match_expression(query)
+    cursor, newer = read_cursors(after, before, parse=float)
+    rows = (
+        _ranked_ids(model, match, cursor, newer, per_page + 1) if match else []
+    )
+    paginator, page = make_page(
+        rows, per_page, newer, cursor is not None, lambda row: row[::-1]
+    )
+    if model is Post:
+        objects = Post.objects.for_feed()
+    else:
+        objects = model.objects.select_related(*RELATED[model])
+    objects = objects.order_by().in_bulk([row[0] for row in page.object_list])
+    page.object_list = [
+        objects[pk] for pk, score in page.object_list if pk in objects
+    ]
+    return paginator, page
+
+
+def rebuild_index():
+    with connection.cursor() as db:
+        for table in INDEXES.values():
+            db.execute(f"INSERT INTO {table}({table}) VALUES('rebuild')")
+
+
+def _triggers(model):
+    """The triggers that keep ``model``'s index in step with its table."""
+    table, index = model._meta.db_table, INDEXES[model]
+    return {
+        f"{index}_ai": (
+            f"AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); "
+            f"END"
+        ),
+        f"{index}_ad": (
+            f"AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {index}({index}, rowid, text) "
+            f"VALUES ('delete', old.id, old.text); "
+            f"END"
+        ),
+        f"{index}_au": (
+            f"AFTER UPDATE OF text ON {table} BEGIN "
+            f"INSERT INTO {index}({index}, rowid, text) "
+            f"VALUES ('delete', old.id, old.text); "
+            f"INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); "
+            f"END"
+        ),
+    }
+
+
+@contextmanager
+def index_suspended():
+    """Skip per-row index updates inside the block, then rebuild once.
+
+    The triggers are dropped for every connection, so posts and comments
+    the site saves meanwhile are only found after the rebuild at the end.
+    """
+    with connection.cursor() as db:
+        for model in INDEXES:
+            for name in _triggers(model):
+                db.execute(f"DROP TRIGGER IF EXISTS {name}")
+    try:
+        yield
+    finally:
+        with connection.cursor() as db:
+            for model in INDEXES:
+                for name, body in _triggers(model).items():
+                    db.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        rebuild_index()
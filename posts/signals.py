@@ -0,0 +1,111 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_feed_version
+from .models import Comment, Follow, Group, Post
+from .page_cache import ALL, invalidate_pages, post_tags
+from .stats import bump_author_stats, bump_comments_count
+from .timeline import (
+    backfill_timeline,
+    demote_celebrity,
+    fan_out_post,
+    is_celebrity,
+    prune_timeline,
+)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        bump_author_stats(instance.author_id, "posts_count", 1)
+        if not is_celebrity(instance.author_id):
+            fan_out_post(instance.id, instance.author_id, instance.pub_date)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump_author_stats(instance.author_id, "posts_count", -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        bump_author_stats(instance.author_id, "followers_count", 1)
+        bump_author_stats(instance.user_id, "following_count", 1)
+        if not is_celebrity(instance.author_id):
+            backfill_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    bump_author_stats(instance.author_id, "followers_count", -1)
+    bump_author_stats(instance.user_id, "following_count", -1)
+    prune_timeline(instance.user_id, instance.author_id)
+    demote_celebrity(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created and instance.post_id:
+        bump_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id:
+        bump_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def feed_changed(sender, **kwargs):
+    bump_feed_version()
+
+
+@receiver(pre_save, sender=Post)
+def post_moving(sender, instance, raw=False, **kwargs):
+    # An edit may move the post out of a group whose pages still show it.
+    if instance.pk and not raw:
+        old = Post.objects.filter(pk=instance.pk).values_list("group_id")
+        invalidate_pages(*(f"group:{group_id}" for group_id, in old))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_pages_changed(sender, instance, **kwargs):
+    invalidate_pages(*post_tags(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_pages_changed(sender, instance, **kwargs):
+    if Comment.post.is_cached(instance):
+        posts = [instance.post]
+    else:
+        # Empty when the comment goes with its post, which was dropped
+        # already.
+        posts = Post.objects.filter(pk=instance.post_id).only(
+            "author", "group"
+        )
+    for post in posts:
+        invalidate_pages(*post_tags(post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_pages_changed(sender, instance, **kwargs):
+    invalidate_pages(
+        f"author:{instance.author_id}", f"author:{instance.user_id}"
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_pages_changed(sender, **kwargs):
+    # Group titles are shown on post cards all over the site.
+    invalidate_pages(ALL)
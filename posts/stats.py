@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+STATS_FIELDS = ("posts_count", "followers_count", "following_count")
+
+
+def _count_by(queryset, field):
+    counts = (
+        queryset.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(number=Count("pk"))
+        .values("number")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def with_counts(users):
+    return users.annotate(
+        posts_number=_count_by(Post.objects, "author"),
+        followers_number=_count_by(Follow.objects, "author"),
+        following_number=_count_by(Follow.objects, "user"),
+    )
+
+
+def count_author_stats(user_id):
+    numbers = (
+        with_counts(User.objects.filter(pk=user_id))
+        .values_list("posts_number", "followers_number", "following_number")
+        .first()
+    )
+    return dict(zip(STATS_FIELDS, numbers or (0, 0, 0)))
+
+
+def get_author_stats(author):
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(
+            user=author, defaults=count_author_stats(author.pk)
+        )
+        return stats
+
+
+def bump_author_stats(user_id, field, delta):
+    """Shift one counter, creating the row from live counts if missing.
+
+    Decrements never create rows, so cascades that are removing the user
+    itself don't resurrect its stats.
+    """
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f"{field}__gte": -delta})
+    if stats.update(**{field: F(field) + delta}) or delta < 0:
+        return
+    AuthorStats.objects.get_or_create(
+        user_id=user_id, defaults=count_author_stats(user_id)
+    )
+
+
+def bump_comments_count(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    posts.update(comments_count=F("comments_count") + delta)
+
+
+def rebuild_comments_count():
+    return Post.objects.update(
+        comments_count=_count_by(Comment.objects, "post")
+    )
+
+
+def rebuild_author_stats(batch_size=1000):
+    users = with_counts(User.objects.order_by()).values_list(
+        "pk", "posts_number", "followers_number", "following_number"
+    )
+    total = 0
+    with transaction.atomic():
+        AuthorStats.objects.all().delete()
+        batch = []
+        for pk, *numbers in users.iterator(chunk_size=batch_size):
+            batch.append(
+                AuthorStats(user_id=pk, **dict(zip(STATS_FIELDS, numbers)))
+            )
+            if len(batch) >= batch_size:
+                AuthorStats.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        AuthorStats.objects.bulk_create(batch)
+        total += len(batch)
+    return total
@@ -0,0 +1,56 @@
+from django import template
+from django.conf import settings
+from django.utils.html import format_html
+from sorl.thumbnail import get_thumbnail
+
+from posts.models import ImageVariant
+
+register = template.Library()
+
+SIZES = "(max-width: 960px) 100vw, 960px"
+
+
+def srcset(variants):
+    return ", ".join(f"{variant.url} {variant.width}w" for variant in variants)
+
+
+@register.simple_tag
+def post_picture(post):
+    """Render a post image as <picture> with JPEG and WebP srcsets.
+
+    Reads the prefetched ``image_variants``; posts whose variants aren't
+    generated yet fall back to the sorl thumbnail.
+    """
+    if not post.image:
+        return ""
+    variants = post.image_variants.all()
+    jpeg = [v for v in variants if v.format == ImageVariant.JPEG]
+    webp = [v for v in variants if v.format == ImageVariant.WEBP]
+    if not jpeg:
+        geometry, options = settings.POST_THUMBNAILS[0]
+        try:
+            thumbnail = get_thumbnail(post.image, geometry, **options)
+        except Exception:
+            return ""
+        return format_html('<img class="card-img" src="{}" />', thumbnail.url)
+
+    largest = jpeg[-1]
+    source = ""
+    if webp:
+        source = format_html(
+            '<source type="image/webp" srcset="{}" sizes="{}">',
+            srcset(webp),
+            SIZES,
+        )
+    return format_html(
+        "<picture>{}"
+        '<img class="card-img" src="{}" srcset="{}" sizes="{}" '
+        'width="{}" height="{}" loading="lazy" alt="" />'
+        "</picture>",
+        source,
+        largest.url,
+        srcset(jpeg),
+        SIZES,
+        largest.width,
+        largest.height,
+    )
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from multiprocessing import get_context
+
+from django.test import SimpleTestCase
+from yatube.cache import SQLiteCache
+
+
+def _increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr("counter")
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, "cache.sqlite3")
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_get_set_delete(self):
+        """Значения сохраняются, читаются и удаляются"""
+        self.cache.set("key", {"value": 1})
+        self.assertEqual(self.cache.get("key"), {"value": 1})
+        self.assertFalse(self.cache.add("key", "other"))
+        self.cache.delete("key")
+        self.assertIsNone(self.cache.get("key"))
+        self.assertTrue(self.cache.add("key", "other"))
+
+    def test_expired_entries_are_missing(self):
+        """Просроченные записи не возвращаются"""
+        self.cache.set("key", "value", timeout=-1)
+        self.assertIsNone(self.cache.get("key"))
+        self.assertFalse(self.cache.has_key("key"))
+        self.assertTrue(self.cache.add("key", "value"))
+
+    def test_shared_between_instances(self):
+        """Записи видны другим экземплярам с тем же файлом"""
+        self.cache.set("key", "value")
+        self.assertEqual(SQLiteCache(self.location, {}).get("key"), "value")
+
+    def test_evicts_least_recently_used(self):
+        """При переполнении вытесняются давно не читавшиеся записи"""
+        cache = SQLiteCache(
+            self.location, {"OPTIONS": {"MAX_ENTRIES": 3, "CULL_FREQUENCY": 4}}
+        )
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+        cache._db.execute("UPDATE cache SET accessed = 0 WHERE key LIKE '%a'")
+        cache.set("d", "d")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual([cache.get(key) for key in "bcd"], ["b", "c", "d"])
+
+    def test_size_checked_every_few_writes(self):
+        """Размер кэша проверяется не при каждой записи"""
+        cache = SQLiteCache(self.location, {"OPTIONS": {"MAX_ENTRIES": 1000}})
+        statements = []
+        cache._db.set_trace_callback(statements.append)
+        for i in range(20):
+            cache.set(f"key{i}", i)
+        counts = [sql for sql in statements if "COUNT(*)" in sql]
+        self.assertEqual(len(counts), 2)
+
+    def test_incr_is_atomic_across_processes(self):
+        """incr не теряет обновлений из разных процессов"""
+        self.cache.set("counter", 0)
+        with get_context("fork").Pool(4) as pool:
+            pool.starmap(_increment, [(self.location, 50)] * 4)
+        self.assertEqual(self.cache.get("counter"), 200)
+
+    def test_incr_missing_key(self):
+        """incr несуществующего ключа вызывает ValueError"""
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
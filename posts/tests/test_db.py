@@ -0,0 +1,144 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from posts.db import retry_atomic, retry_locked, retry_save
+from posts.forms import PostForm
+from posts.models import Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+@override_settings(SQLITE_WRITE_BACKOFF=0)
+class SQLiteTuningTest(TestCase):
+    def test_pragmas_applied_to_connection(self):
+        """Новое соединение получает настройки из SQLITE_PRAGMAS"""
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            busy_timeout = cursor.fetchone()[0]
+            cursor.execute("PRAGMA temp_store")
+            temp_store = cursor.fetchone()[0]
+        self.assertEqual(
+            busy_timeout, settings.SQLITE_PRAGMAS["busy_timeout"]
+        )
+        self.assertEqual(temp_store, 2)
+
+    def test_retry_locked_until_success(self):
+        """Запись повторяется, пока база заблокирована"""
+        attempts = []
+
+        def write():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise sqlite3.OperationalError("database is locked")
+            return "done"
+
+        self.assertEqual(retry_locked(write), "done")
+        self.assertEqual(len(attempts), 3)
+
+    def test_retry_locked_gives_up(self):
+        """После SQLITE_WRITE_RETRIES повторов ошибка пробрасывается"""
+        attempts = []
+
+        def write():
+            attempts.append(1)
+            raise OperationalError("database is locked")
+
+        with self.assertRaises(OperationalError):
+            retry_locked(write)
+        self.assertEqual(len(attempts), settings.SQLITE_WRITE_RETRIES + 1)
+
+    def test_other_errors_are_not_retried(self):
+        """Прочие ошибки базы не повторяются"""
+        attempts = []
+
+        def write():
+            attempts.append(1)
+            raise OperationalError("no such table: missing")
+
+        with self.assertRaises(OperationalError):
+            retry_locked(write)
+        self.assertEqual(len(attempts), 1)
+
+
+@override_settings(
+    SQLITE_WRITE_BACKOFF=0,
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_THUMBNAILS_ASYNC=False,
+    TIMELINE_ASYNC=False,
+)
+class RetryAtomicTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_rolls_back_failed_attempt(self):
+        """Неудачная попытка откатывается перед повтором"""
+        attempts = []
+
+        def write():
+            attempts.append(1)
+            Group.objects.create(
+                title="Группа", slug=f"group-{len(attempts)}", description=""
+            )
+            if len(attempts) == 1:
+                raise OperationalError("database is locked")
+            return "done"
+
+        self.assertEqual(retry_atomic(write), "done")
+        self.assertEqual(
+            list(Group.objects.values_list("slug", flat=True)), ["group-2"]
+        )
+
+    def test_no_retry_in_outer_transaction(self):
+        """Внутри внешней транзакции попытка не повторяется"""
+        attempts = []
+
+        def write():
+            attempts.append(1)
+            raise OperationalError("database is locked")
+
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                retry_atomic(write)
+        self.assertEqual(len(attempts), 1)
+
+    def test_retried_post_stores_image_once(self):
+        """Повтор сохранения поста не записывает картинку заново"""
+        author = User.objects.create(username="author")
+        uploaded = SimpleUploadedFile(
+            name="small.gif", content=SMALL_GIF, content_type="image/gif"
+        )
+        form = PostForm({"text": "Текст"}, files={"image": uploaded})
+        self.assertTrue(form.is_valid())
+        form.instance.author = author
+        attempts = []
+
+        def save():
+            attempts.append(1)
+            post = form.save()
+            if len(attempts) == 1:
+                raise OperationalError("database is locked")
+            return post
+
+        form.save_image()
+        post = retry_save(form.instance, save)
+
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(list(Post.objects.all()), [post])
+        uploads = os.listdir(os.path.join(TEMP_MEDIA_ROOT, "posts"))
+        self.assertEqual(uploads, ["small.gif"])
@@ -0,0 +1,96 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Group, Post, User
+
+
+@override_settings(TIMELINE_ASYNC=False, EXPORT_BLOCK_SIZE=64)
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f"Пост {i}",
+                author=cls.author,
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def download(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_profile_export_jsonl(self):
+        """Посты автора выгружаются в JSONL вместе с автором и группами"""
+        response, content = self.download(
+            reverse("profile_export", args=[self.author.username])
+        )
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertIn(
+            'filename="author.jsonl"', response["Content-Disposition"]
+        )
+        self.assertEqual([row["type"] for row in rows[:2]], ["user", "group"])
+        self.assertEqual(
+            [row["text"] for row in rows[2:]],
+            [post.text for post in self.posts],
+        )
+
+    def test_group_export_csv_gzip(self):
+        """Посты группы выгружаются в сжатый CSV"""
+        response, content = self.download(
+            reverse("group_export", args=[self.group.slug]),
+            format="csv",
+            gzip="1",
+        )
+        lines = gzip.decompress(content).decode().splitlines()
+        rows = list(csv.DictReader(lines))
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertEqual(
+            [row["text"] for row in rows if row["type"] == "post"],
+            ["Пост 1", "Пост 3"],
+        )
+
+    def test_export_requires_login(self):
+        """Выгрузка доступна только авторизованным пользователям"""
+        response = Client().get(
+            reverse("profile_export", args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_command_export_can_be_imported(self):
+        """Выгрузка команды загружается обратно через import_yatube"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "author.jsonl")
+        call_command("export_posts", "--author=author", f"--output={path}")
+
+        call_command(
+            "import_yatube", path, stdout=StringIO(), stderr=StringIO()
+        )
+        self.assertEqual(
+            Post.objects.filter(author=self.author, group=self.group).count(),
+            4,
+        )
+        self.assertEqual(User.objects.count(), 1)
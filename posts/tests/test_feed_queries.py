@@ -0,0 +1,87 @@
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+
+
+@override_settings(
+    TIMELINE_ASYNC=False,
+    PER_PAGE=100,
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    },
+)
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(username="reader")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def add_posts(self, number):
+        """Posts by different authors, each with a group and a comment."""
+        start = Post.objects.count()
+        for i in range(start, start + number):
+            author = User.objects.create(username=f"author{i}")
+            Follow.objects.create(user=self.reader, author=author)
+            post = Post.objects.create(
+                text=f"Пост {i}", author=author, group=self.group
+            )
+            Comment.objects.create(
+                post=post, author=self.reader, text="Комментарий"
+            )
+
+    def count_queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return len(response.context["page"]), len(queries)
+
+    def assertConstantQueries(self, url, data=None):
+        self.add_posts(1)
+        shown, one = self.count_queries(url, data)
+        self.assertEqual(shown, 1)
+        self.add_posts(99)
+        shown, many = self.count_queries(url, data)
+        self.assertEqual(shown, 100)
+        self.assertEqual(one, many)
+
+    def test_index(self):
+        """Главная страница делает одинаковое число запросов"""
+        self.assertConstantQueries(reverse("index"))
+
+    def test_index_numbered(self):
+        """Нумерованная главная страница делает одинаковое число запросов"""
+        self.assertConstantQueries(reverse("index"), {"page": 1})
+
+    def test_group(self):
+        """Страница группы делает одинаковое число запросов"""
+        self.assertConstantQueries(reverse("group", args=[self.group.slug]))
+
+    def test_profile(self):
+        """Профиль делает одинаковое число запросов"""
+        author = User.objects.create(username="author")
+        url = reverse("profile", args=[author.username])
+        Post.objects.create(text="Пост", author=author, group=self.group)
+        shown, one = self.count_queries(url)
+        Post.objects.bulk_create(
+            Post(text=f"Пост {i}", author=author, group=self.group)
+            for i in range(99)
+        )
+        shown, many = self.count_queries(url)
+        self.assertEqual(shown, 100)
+        self.assertEqual(one, many)
+
+    def test_follow(self):
+        """Лента подписок делает одинаковое число запросов"""
+        self.assertConstantQueries(reverse("follow_index"))
+
+    def test_follow_numbered(self):
+        """Нумерованная лента подписок делает одинаковое число запросов"""
+        self.assertConstantQueries(reverse("follow_index"), {"page": 1})
@@ -1,20 +1,23 @@
+import os
 import shutil
 import tempfile
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
-from posts.models import Group, Post, User
+from posts.forms import PostForm
+from posts.models import Comment, Group, Post, User
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
 
-        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
-
         cls.group = Group.objects.create(
             title="Тестовый заголовок",
             slug="test-slug",
@@ -25,7 +28,7 @@ class PostFormTests(TestCase):
 
     @classmethod
     def tearDownClass(cls):
-        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
         super().tearDownClass()
 
     def setUp(self):
@@ -83,3 +86,58 @@ class PostFormTests(TestCase):
         )
         post.refresh_from_db()
         self.assertEqual(post.text, form_data["text"])
+
+    def test_post_edit_keeps_comments_count(self):
+        """Редактирование не затирает комментарии, добавленные во время него"""
+        post = Post.objects.create(
+            text="Просто текст", author=PostFormTests.author
+        )
+        form = PostForm({"text": "Новый текст"}, instance=post)
+        self.assertTrue(form.is_valid())
+        Comment.objects.create(
+            post_id=post.id, author=PostFormTests.author, text="Комментарий"
+        )
+        form.save()
+
+        post.refresh_from_db()
+        self.assertEqual(
+            (post.text, post.comments_count), ("Новый текст", 1)
+        )
+
+    @override_settings(POST_THUMBNAILS_ASYNC=False)
+    def test_create_post_pregenerates_thumbnails(self):
+        """Миниатюры и варианты создаются при сохранении поста с картинкой"""
+        small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x02\x00"
+            b"\x01\x00\x80\x00\x00\x00\x00\x00"
+            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+            b"\x0A\x00\x3B"
+        )
+        uploaded = SimpleUploadedFile(
+            name="thumb.gif", content=small_gif, content_type="image/gif"
+        )
+
+        self.authorized_client.post(
+            reverse("new_post"),
+            data={"text": "С картинкой", "image": uploaded},
+        )
+
+        post = Post.objects.get(text="С картинкой")
+        self.assertTrue(post.image.name.startswith("posts/thumb"))
+        thumbnails = [
+            name
+            for _, _, names in os.walk(
+                os.path.join(settings.MEDIA_ROOT, "cache")
+            )
+            for name in names
+        ]
+        self.assertEqual(len(thumbnails), len(settings.POST_THUMBNAILS))
+        self.assertEqual(
+            post.image_variants.count(), len(settings.POST_IMAGE_WIDTHS) * 2
+        )
+
+        response = self.authorized_client.get(reverse("index"))
+        self.assertContains(response, "<picture>")
+        self.assertContains(response, 'type="image/webp"')
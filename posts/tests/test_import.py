@@ -0,0 +1,176 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from posts.models import (
+    AuthorStats,
+    Comment,
+    Follow,
+    Group,
+    ImportCheckpoint,
+    Post,
+    TimelineEntry,
+    User,
+)
+from posts.search import search
+
+ROWS = [
+    {"type": "user", "id": 1, "username": "old_author"},
+    {"type": "user", "id": 2, "username": "old_reader"},
+    {
+        "type": "group",
+        "id": "g",
+        "title": "Группа",
+        "slug": "old",
+        "description": "Описание",
+    },
+    {
+        "type": "post",
+        "id": 10,
+        "author": 1,
+        "group": "g",
+        "text": "Пост со старой платформы",
+        "pub_date": "2019-05-01T12:00:00",
+    },
+    {
+        "type": "comment",
+        "id": 20,
+        "post": 10,
+        "author": 2,
+        "text": "Старый комментарий",
+        "created": "2019-05-02T12:00:00",
+    },
+    {"type": "follow", "user": 2, "author": 1},
+]
+
+
+@override_settings(TIMELINE_ASYNC=False)
+class ImportYatubeTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_jsonl(self, rows, name="import.jsonl"):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as file:
+            for row in rows:
+                file.write(
+                    row if isinstance(row, str) else json.dumps(row) + "\n"
+                )
+        return path
+
+    def call(self, *args, **options):
+        stderr = StringIO()
+        call_command(
+            "import_yatube", *args, stdout=StringIO(), stderr=stderr, **options
+        )
+        return stderr.getvalue()
+
+    def test_import_jsonl(self):
+        """Импорт создаёт объекты со старыми датами и связями"""
+        self.call(self.write_jsonl(ROWS), chunk_size=2)
+
+        post = Post.objects.get(text="Пост со старой платформы")
+        self.assertEqual(post.author.username, "old_author")
+        self.assertEqual(post.group.slug, "old")
+        self.assertEqual(post.pub_date.year, 2019)
+        comment = Comment.objects.get()
+        self.assertEqual(
+            (comment.post, comment.author.username), (post, "old_reader")
+        )
+        self.assertTrue(
+            Follow.objects.filter(
+                user__username="old_reader", author=post.author
+            ).exists()
+        )
+
+    def test_counters_and_indexes_rebuilt(self):
+        """После импорта пересчитаны счётчики, лента и поисковый индекс"""
+        self.call(self.write_jsonl(ROWS))
+
+        post = Post.objects.get()
+        self.assertEqual(post.comments_count, 1)
+        stats = AuthorStats.objects.get(user=post.author)
+        self.assertEqual((stats.posts_count, stats.followers_count), (1, 1))
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user__username="old_reader", post=post
+            ).exists()
+        )
+        self.assertEqual(list(search(Post, "платформы")[1]), [post])
+
+        Post.objects.create(
+            text="Новый пост про платформы", author=post.author
+        )
+        self.assertEqual(len(search(Post, "платформы")[1]), 2)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        """Некорректные строки пропускаются с сообщением об ошибке"""
+        path = self.write_jsonl(
+            ROWS[:2]
+            + [
+                "not json\n",
+                {"type": "post", "id": 11, "author": 99, "text": "Текст"},
+                {"type": "post", "id": 12, "author": 1},
+                {"type": "user", "id": 3, "username": "bad name!"},
+            ]
+        )
+        errors = self.call(path)
+
+        self.assertIn(":3:", errors)
+        self.assertIn("неизвестный user 99", errors)
+        self.assertIn("нет поля text", errors)
+        self.assertIn("username", errors)
+        self.assertEqual(Post.objects.count(), 0)
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_ids_assigned_by_database(self):
+        """Импорт не занимает id и сообщает о повторных строках"""
+        author = User.objects.create(username="author")
+        live = Post.objects.create(text="Пост сайта", author=author)
+        path = self.write_jsonl(ROWS[:4] + [ROWS[3]])
+        out = StringIO()
+        errors = StringIO()
+        call_command("import_yatube", path, stdout=out, stderr=errors)
+
+        post = Post.objects.get(text="Пост со старой платформы")
+        self.assertGreater(post.pk, live.pk)
+        self.assertIn(":5: post 10 уже импортирован", errors.getvalue())
+        self.assertIn("пропущено строк: 1", out.getvalue())
+        after = Post.objects.create(text="Новый пост сайта", author=author)
+        self.assertGreater(after.pk, post.pk)
+
+    def test_resume_after_checkpoint(self):
+        """Повторный запуск продолжает импорт после сохранённой строки"""
+        path = self.write_jsonl(ROWS)
+        self.call(path, chunk_size=2)
+        self.assertEqual(
+            ImportCheckpoint.objects.get(source=os.path.abspath(path)).line,
+            len(ROWS),
+        )
+        self.call(path)
+        self.assertEqual(Post.objects.count(), 1)
+
+        ImportCheckpoint.objects.filter(source=os.path.abspath(path)).update(
+            line=4
+        )
+        self.call(path)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_import_csv(self):
+        """CSV импортируется с типом из параметра --type"""
+        path = os.path.join(self.directory, "groups.csv")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("id,title,slug,description\n")
+            file.write("1,Первая,first,Описание\n")
+            file.write("2,Вторая,second,Описание\n")
+        self.call(path, type="group")
+        self.assertEqual(
+            sorted(Group.objects.values_list("slug", flat=True)),
+            ["first", "second"],
+        )
@@ -0,0 +1,104 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase, override_settings
+from posts.models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+def seed(**options):
+    call_command(
+        "seed_load",
+        users=50,
+        groups=3,
+        posts=300,
+        comments=200,
+        follows=300,
+        stdout=StringIO(),
+        **options,
+    )
+
+
+@override_settings(TIMELINE_ASYNC=False)
+class SeedLoadTest(TestCase):
+    def test_creates_requested_objects(self):
+        """seed_load создаёт заданное число объектов"""
+        seed()
+        self.assertEqual(
+            User.objects.filter(username__startswith="load_").count(), 50
+        )
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertEqual(Follow.objects.count(), 300)
+
+    def test_popularity_is_skewed(self):
+        """Подписчики и посты сосредоточены у немногих авторов"""
+        seed()
+        followers = list(
+            AuthorStats.objects.order_by("-followers_count").values_list(
+                "followers_count", flat=True
+            )
+        )
+        top = sum(followers[:5])
+        self.assertGreater(top, sum(followers) / 3)
+        posts = sorted(
+            AuthorStats.objects.values_list("posts_count", flat=True),
+            reverse=True,
+        )
+        self.assertGreater(sum(posts[:5]), 300 / 3)
+
+    def test_same_prefix_twice(self):
+        """Повторный запуск с тем же префиксом отклоняется"""
+        seed()
+        with self.assertRaises(CommandError):
+            seed()
+
+
+@override_settings(TIMELINE_ASYNC=False)
+class BenchViewsTest(TransactionTestCase):
+    def test_reports_percentiles_as_json(self):
+        """bench_views выводит пропускную способность и перцентили"""
+        seed()
+        out = StringIO()
+        call_command(
+            "bench_views",
+            requests=4,
+            concurrency=1,
+            views=["index", "post_view", "add_comment"],
+            stdout=out,
+        )
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(
+            set(report["views"]), {"index", "post_view", "add_comment"}
+        )
+        for result in report["views"].values():
+            self.assertEqual(result["requests"], 4)
+            self.assertEqual(result["errors"], 0)
+            self.assertGreater(result["throughput_rps"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        self.assertEqual(Comment.objects.count(), 204)
+
+    def test_index_cursors_without_cache(self):
+        """bench_views открывает главную по курсорам и без кэша"""
+        seed()
+        out = StringIO()
+        call_command(
+            "bench_views",
+            requests=12,
+            concurrency=1,
+            views=["index"],
+            no_cache=True,
+            stdout=out,
+        )
+        report = json.loads(out.getvalue())
+
+        self.assertFalse(report["cache"])
+        self.assertEqual(report["views"]["index"]["errors"], 0)
+
+    def test_without_seeded_data(self):
+        """Без данных seed_load команда сообщает об ошибке"""
+        with self.assertRaises(CommandError):
+            call_command("bench_views", stdout=StringIO())
@@ -0,0 +1,107 @@
+import json
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import ResolverMatch, reverse
+from posts.models import User
+from yatube.metrics import (
+    MetricsMiddleware,
+    QueryBudgetExceeded,
+    query_budget,
+    registry,
+)
+
+
+@query_budget(1)
+def budgeted_view(request):
+    User.objects.count()
+    User.objects.count()
+    return HttpResponse()
+
+
+def run_view(view, name="budgeted"):
+    def get_response(request):
+        request.resolver_match = ResolverMatch(view, (), {}, url_name=name)
+        return view(request)
+
+    return MetricsMiddleware(get_response)(RequestFactory().get("/"))
+
+
+@override_settings(METRICS_TOKEN="secret")
+class MetricsTest(TestCase):
+    def scrape(self, **headers):
+        return self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret", **headers
+        )
+
+    def test_metrics_endpoint(self):
+        """Эндпоинт отдаёт метрики запросов в формате Prometheus"""
+        self.client.get(reverse("index"))
+        response = self.scrape()
+        content = response.content.decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('yatube_requests_total{view="index"}', content)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket{view="index",le="+Inf"}',
+            content,
+        )
+        self.assertIn('yatube_db_queries_total{view="index"}', content)
+        self.assertIn(
+            'yatube_db_duration_seconds_total{view="index"}', content
+        )
+
+    def test_metrics_endpoint_is_internal(self):
+        """Метрики доступны только с токеном или сотрудникам"""
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 403)
+
+        user = User.objects.create(username="staff")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        user.is_staff = True
+        user.save()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_processes_are_summed(self):
+        """Счётчики других процессов складываются с текущими"""
+        self.client.get(reverse("index"))
+        before = registry.collect()["index"]["requests"]
+        other = os.path.join(settings.METRICS_DIR, "1-other.json")
+        with open(other, "w") as file:
+            json.dump(registry.snapshot(), file)
+        self.addCleanup(os.remove, other)
+
+        content = self.scrape().content.decode()
+        self.assertIn(
+            f'yatube_requests_total{{view="index"}} {before * 2}', content
+        )
+
+    def test_queries_are_counted(self):
+        """Запросы к базе и их время учитываются по имени представления"""
+        def view(request):
+            User.objects.count()
+            User.objects.exists()
+            return HttpResponse()
+
+        run_view(view, name="counted")
+        metrics = registry.views["counted"]
+        self.assertEqual((metrics.requests, metrics.queries), (1, 2))
+        self.assertGreater(metrics.db_duration, 0)
+
+    def test_budget_raises_in_tests(self):
+        """Превышение бюджета запросов в тестах вызывает исключение"""
+        with self.assertRaises(QueryBudgetExceeded):
+            run_view(budgeted_view)
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_budget_logs_warning(self):
+        """Без строгого режима превышение бюджета пишется в лог"""
+        with self.assertLogs("yatube.metrics", "WARNING") as logs:
+            run_view(budgeted_view, name="logged")
+        self.assertIn("logged ran 2 queries, its budget is 1", logs.output[0])
+        self.assertEqual(registry.views["logged"].over_budget, 1)
@@ -0,0 +1,241 @@
+import gzip
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.cache import primary_feed_version
+from posts.importer import rebuild_denormalized
+from posts.models import Comment, Follow, Group, Post, User
+from posts.replica import REPLICA_STATE_KEY
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=600, TIMELINE_ASYNC=False)
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.other = User.objects.create(username="other")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        cls.other_group = Group.objects.create(
+            title="Другая группа", slug="other", description="Описание"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text="Текст поста", author=self.author, group=self.group
+        )
+
+    def get(self, url, client=None, **headers):
+        return (client or self.client).get(url, **headers)
+
+    def assertCached(self, url):
+        # A page from the page cache is never rendered, so it has no
+        # context.
+        self.assertIsNone(self.get(url).context, url)
+
+    def assertRendered(self, url):
+        self.assertIsNotNone(self.get(url).context, url)
+
+    def test_anonymous_page_is_cached(self):
+        """Страница для гостей отдаётся из кэша без отрисовки"""
+        url = reverse("post", args=[self.author.username, self.post.pk])
+        first = self.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text="В обход сигналов")
+        second = self.get(url)
+
+        self.assertIsNone(second.context)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second["Content-Type"], first["Content-Type"])
+
+    def test_compressed_body(self):
+        """Клиенту с поддержкой gzip тело отдаётся сжатым"""
+        url = reverse("index")
+        page = self.get(url).content
+        response = self.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), page)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_hit_keeps_headers(self):
+        """Копия из кэша отдаётся с заголовками отрисованной страницы"""
+        url = reverse("group", args=[self.group.slug])
+        miss = self.get(url)
+        hit = self.get(url)
+
+        self.assertIsNone(hit.context)
+        self.assertIn("Cookie", miss["Vary"])
+        for header in ("Content-Type", "Cache-Control", "Vary", "ETag"):
+            self.assertEqual(hit[header], miss[header], header)
+
+    def test_signed_in_users_are_not_served(self):
+        """Авторизованные пользователи не получают кэшированные страницы"""
+        client = Client()
+        client.force_login(self.other)
+        self.get(reverse("index"))
+
+        self.assertIsNotNone(self.get(reverse("index"), client).context)
+
+    def test_query_string_is_part_of_key(self):
+        """Страницы с разными параметрами кэшируются отдельно"""
+        self.get(reverse("index"))
+        self.assertRendered(reverse("index") + "?page=1")
+
+    def test_new_post_invalidates_its_pages_only(self):
+        """Новый пост сбрасывает ленты, где он виден, и только их"""
+        pages = {
+            "index": reverse("index"),
+            "group": reverse("group", args=[self.group.slug]),
+            "profile": reverse("profile", args=[self.author.username]),
+            "other_group": reverse("group", args=[self.other_group.slug]),
+            "other_profile": reverse("profile", args=[self.other.username]),
+            "about": reverse("about:author"),
+        }
+        for url in pages.values():
+            self.get(url)
+
+        Post.objects.create(
+            text="Новый пост", author=self.author, group=self.group
+        )
+
+        for name in ("index", "group", "profile"):
+            self.assertRendered(pages[name])
+        for name in ("other_group", "other_profile", "about"):
+            self.assertCached(pages[name])
+
+    def test_comment_invalidates_post_page(self):
+        """Комментарий сбрасывает страницу поста и ленты с его счётчиком"""
+        post_url = reverse("post", args=[self.author.username, self.post.pk])
+        profile_url = reverse("profile", args=[self.author.username])
+        other_url = reverse("profile", args=[self.other.username])
+        for url in (post_url, profile_url, other_url):
+            self.get(url)
+
+        Comment.objects.create(
+            post=self.post, author=self.other, text="Комментарий"
+        )
+
+        self.assertContains(self.get(post_url), "Комментарий")
+        self.assertRendered(profile_url)
+        self.assertCached(other_url)
+
+    def test_follow_invalidates_both_profiles(self):
+        """Подписка сбрасывает профили обоих пользователей"""
+        author_url = reverse("profile", args=[self.author.username])
+        other_url = reverse("profile", args=[self.other.username])
+        self.get(author_url)
+        self.get(other_url)
+
+        Follow.objects.create(user=self.other, author=self.author)
+
+        self.assertRendered(author_url)
+        self.assertRendered(other_url)
+
+    def test_edit_invalidates_old_group(self):
+        """Перенос поста в другую группу сбрасывает страницу прежней"""
+        url = reverse("group", args=[self.group.slug])
+        self.get(url)
+
+        self.post.group = self.other_group
+        self.post.save()
+
+        self.assertNotContains(self.get(url), "Текст поста")
+
+    def test_group_change_invalidates_everything(self):
+        """Изменение группы сбрасывает все страницы"""
+        about_url = reverse("about:tech")
+        self.get(about_url)
+        self.assertCached(about_url)
+
+        self.group.title = "Новое название"
+        self.group.save()
+
+        self.assertRendered(about_url)
+
+    def test_rebuilds_invalidate_everything(self):
+        """Пересчёт денормализованных данных сбрасывает все страницы"""
+        url = reverse("profile", args=[self.author.username])
+        self.get(url)
+        rebuild_denormalized()
+        self.assertRendered(url)
+
+        for command in (
+            "rebuild_author_stats",
+            "rebuild_comments_count",
+            "rebuild_timeline",
+        ):
+            with self.subTest(command=command):
+                self.get(url)
+                call_command(command, stdout=StringIO())
+                self.assertRendered(url)
+
+    # Reads stay on the primary; only the replica's state is faked.
+    @override_settings(REPLICA_APPS=())
+    def test_replica_pages(self):
+        """Страницы с реплики кэшируются, только если в ней все записи"""
+        url = reverse("group", args=[self.group.slug])
+        cache.set(REPLICA_STATE_KEY, (time.time(), primary_feed_version()))
+        self.get(url)
+        self.assertCached(url)
+
+        self.group.title = "Новое название"
+        self.group.save()
+        # The replica was synced before the edit.
+        self.assertRendered(url)
+        self.assertRendered(url)
+
+    def test_missing_pages_are_not_cached(self):
+        """Ответы 404 не кэшируются"""
+        url = reverse("group", args=["missing"])
+        self.assertEqual(self.get(url).status_code, 404)
+        Group.objects.create(title="Новая", slug="missing", description="")
+
+        self.assertEqual(self.get(url).status_code, 200)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=600, TIMELINE_ASYNC=False)
+class StaticPageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(
+            PAGE_CACHE_STATIC_ROOT=self.directory
+        )
+        self.settings.enable()
+        self.author = User.objects.create(username="author")
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def path(self, *parts):
+        return os.path.join(self.directory, *parts, "index.html")
+
+    def test_pages_written_and_removed(self):
+        """Страницы пишутся в файлы и удаляются при изменениях"""
+        page = self.client.get(reverse("index")).content
+        self.client.get(reverse("profile", args=[self.author.username]))
+        self.client.get(reverse("index"), {"page": 1})
+
+        with open(self.path(), "rb") as file:
+            self.assertEqual(file.read(), page)
+        with open(self.path() + ".gz", "rb") as file:
+            self.assertEqual(gzip.decompress(file.read()), page)
+        self.assertTrue(os.path.exists(self.path("author")))
+
+        other = User.objects.create(username="other")
+        Post.objects.create(text="Новый пост", author=other)
+
+        self.assertFalse(os.path.exists(self.path()))
+        self.assertFalse(os.path.exists(self.path() + ".gz"))
+        self.assertTrue(os.path.exists(self.path("author")))
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import ResolverMatch
+from yatube.profiling import ProfilingMiddleware, profile_token
+
+
+def view(request):
+    sum(range(1000))
+    return HttpResponse()
+
+
+def get_response(request):
+    request.resolver_match = ResolverMatch(
+        view, (), {}, url_name="post", namespaces=["api"]
+    )
+    return view(request)
+
+
+class ProfilingTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(
+            PROFILING=True, PROFILE_SAMPLE_RATE=0, PROFILE_DIR=self.directory
+        )
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def request(self, **headers):
+        middleware = ProfilingMiddleware(get_response)
+        return middleware(RequestFactory().get("/", **headers))
+
+    def profiles(self, view_name="api.post"):
+        directory = os.path.join(self.directory, view_name)
+        if not os.path.isdir(directory):
+            return []
+        return os.listdir(directory)
+
+    def test_disabled(self):
+        """Выключенное профилирование убирает middleware из цепочки"""
+        with override_settings(PROFILING=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(get_response)
+
+    def test_sample_rate(self):
+        """Доля запросов профилируется и сохраняется по имени URL"""
+        self.request()
+        self.assertEqual(self.profiles(), [])
+        with override_settings(PROFILE_SAMPLE_RATE=1):
+            response = self.request()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.profiles()), 1)
+
+    def test_signed_header(self):
+        """Запрос с подписанным заголовком профилируется всегда"""
+        self.request(HTTP_X_YATUBE_PROFILE="profile:forged:value")
+        self.assertEqual(self.profiles(), [])
+        self.request(HTTP_X_YATUBE_PROFILE=profile_token())
+        self.assertEqual(len(self.profiles()), 1)
+
+    def test_report(self):
+        """profile_report объединяет профили и пишет стеки flame graph"""
+        with override_settings(PROFILE_SAMPLE_RATE=1):
+            self.request()
+            self.request()
+        folded = os.path.join(self.directory, "folded")
+        out = StringIO()
+        call_command(
+            "profile_report", folded=folded, limit=100, stdout=out
+        )
+
+        self.assertIn("api.post: запросов 2", out.getvalue())
+        self.assertIn("test_profiling.py:14(view)", out.getvalue())
+        with open(os.path.join(folded, "api.post.folded")) as file:
+            stacks = file.read().splitlines()
+        self.assertTrue(stacks)
+        for stack in stacks:
+            frames, micros = stack.rsplit(" ", 1)
+            self.assertTrue(frames.startswith("profiling.py:"))
+            self.assertGreater(int(micros), 0)
+
+    def test_report_unknown_view(self):
+        """profile_report называет доступные представления"""
+        self.request(HTTP_X_YATUBE_PROFILE=profile_token())
+        with self.assertRaisesMessage(CommandError, "есть: api.post"):
+            call_command("profile_report", "index", stdout=StringIO())
@@ -0,0 +1,161 @@
+import re
+
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.client import RequestFactory
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+from posts.page_cache import group_page_tags, post_page_tags, profile_page_tags
+
+# Tables whose queries must be served by an index: a full scan or a sort
+# of these grows with the whole table, not with the page.
+HOT_TABLES = {
+    "posts_post",
+    "posts_comment",
+    "posts_follow",
+    "posts_timelineentry",
+}
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?\w+$")
+TEMP_SORT = "USE TEMP B-TREE"
+
+
+@override_settings(
+    TIMELINE_ASYNC=False,
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    },
+)
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.reader = User.objects.create(username="reader")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                text=f"Пост {i}",
+                author=cls.author,
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(15)
+        ]
+        cls.post = cls.posts[0]
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f"Комментарий {i}"
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def capture(self, action):
+        """Run ``action`` and return the SELECTs it sent."""
+        queries = []
+
+        def wrapper(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith("SELECT"):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            action()
+        return queries
+
+    def plan(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexed(self, queries):
+        checked = 0
+        for sql, params in queries:
+            table = re.search(r'FROM "(\w+)"', sql)
+            if not table or table.group(1) not in HOT_TABLES:
+                continue
+            checked += 1
+            plan = self.plan(sql, params)
+            slow = [
+                line
+                for line in plan
+                if FULL_SCAN.match(line) or line.startswith(TEMP_SORT)
+            ]
+            details = "\n".join(f"  {line}" for line in plan)
+            self.assertEqual(slow, [], f"\n{sql}\n{details}")
+        self.assertGreater(checked, 0)
+
+    def assertPageIndexed(self, url, data=None):
+        queries = self.capture(lambda: self.client.get(url, data))
+        self.assertIndexed(queries)
+
+    def test_index(self):
+        """Главная страница читает посты по индексу"""
+        self.assertPageIndexed(reverse("index"))
+        self.assertPageIndexed(reverse("index"), {"page": 2})
+
+    def test_group(self):
+        """Лента группы читается по индексу (group, pub_date)"""
+        url = reverse("group", args=[self.group.slug])
+        self.assertPageIndexed(url)
+        self.assertPageIndexed(url, {"page": 1})
+
+    def test_profile(self):
+        """Лента автора читается по индексу (author, pub_date)"""
+        url = reverse("profile", args=[self.author.username])
+        self.assertPageIndexed(url)
+        self.assertPageIndexed(url, {"page": 2})
+
+    def test_post(self):
+        """Страница поста читает пост и комментарии по индексу"""
+        self.assertPageIndexed(
+            reverse("post", args=[self.author.username, self.post.pk])
+        )
+        self.assertPageIndexed(
+            reverse(
+                "post_comments", args=[self.author.username, self.post.pk]
+            )
+        )
+
+    def test_follow(self):
+        """Лента подписок читается из ленты пользователя по индексу"""
+        self.assertPageIndexed(reverse("follow_index"))
+
+    def test_api_feeds(self):
+        """Ленты API читаются по индексу"""
+        self.assertPageIndexed(reverse("api:index"))
+        self.assertPageIndexed(reverse("api:group", args=[self.group.slug]))
+        self.assertPageIndexed(
+            reverse("api:profile", args=[self.author.username])
+        )
+
+    def test_fan_out(self):
+        """Рассылка поста подписчикам выбирает их по индексу"""
+        queries = self.capture(
+            lambda: Post.objects.create(text="Новый пост", author=self.author)
+        )
+        self.assertIndexed(queries)
+
+    def test_conditional_state(self):
+        """Теги для условных GET читаются одной записью индекса"""
+        request = RequestFactory().get("/")
+        lookups = {
+            "group": lambda: group_page_tags(request, self.group.slug),
+            "profile": lambda: profile_page_tags(
+                request, self.author.username
+            ),
+            "post": lambda: post_page_tags(
+                request, self.author.username, self.post.pk
+            ),
+        }
+        for page, lookup in lookups.items():
+            with self.subTest(page=page):
+                queries = self.capture(lookup)
+                self.assertEqual(len(queries), 1)
+                plan = self.plan(*queries[0])
+                self.assertTrue(
+                    all(line.startswith("SEARCH") for line in plan), plan
+                )
@@ -0,0 +1,106 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from posts.models import Post
+from posts.replica import (
+    LAST_WRITE_COOKIE,
+    REPLICA_STATE_KEY,
+    ReplicaMiddleware,
+    ReplicaRouter,
+    copy_database,
+    replica_state,
+)
+
+
+class ReplicaTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(
+                (replica_state(), ReplicaRouter().db_for_read(Post))
+            )
+            return HttpResponse()
+
+        self.middleware = ReplicaMiddleware(view)
+
+    def tearDown(self):
+        cache.delete(REPLICA_STATE_KEY)
+
+    def test_reads_primary_without_replica(self):
+        """Без синхронизированной реплики чтение идёт из основной базы"""
+        self.middleware(self.factory.get("/"))
+        self.assertEqual(self.seen, [(None, "default")])
+
+    def test_reads_fresh_replica(self):
+        """Безопасные запросы читают свежую реплику"""
+        cache.set(REPLICA_STATE_KEY, (time.time(), 7))
+        self.middleware(self.factory.get("/"))
+        state, alias = self.seen[0]
+        self.assertEqual(alias, "replica")
+        self.assertEqual(state[1], 7)
+        self.assertEqual(ReplicaRouter().db_for_read(Session), "default")
+        self.assertEqual(ReplicaRouter().db_for_read(Post), "default")
+
+    def test_stale_replica_is_not_used(self):
+        """Устаревшая реплика не используется"""
+        cache.set(REPLICA_STATE_KEY, (time.time() - 3600, 7))
+        self.middleware(self.factory.get("/"))
+        self.assertEqual(self.seen, [(None, "default")])
+
+    def test_reads_own_writes(self):
+        """После записи пользователь читает основную базу до синхронизации"""
+        cache.set(REPLICA_STATE_KEY, (time.time(), 7))
+        response = self.middleware(self.factory.post("/"))
+        self.assertEqual(self.seen[0], (None, "default"))
+
+        request = self.factory.get("/")
+        request.COOKIES[LAST_WRITE_COOKIE] = response.cookies[
+            LAST_WRITE_COOKIE
+        ].value
+        self.middleware(request)
+        self.assertEqual(self.seen[1], (None, "default"))
+
+        cache.set(REPLICA_STATE_KEY, (time.time() + 1, 8))
+        self.middleware(request)
+        self.assertEqual(self.seen[2][1], "replica")
+
+    def test_write_on_get_sets_cookie(self):
+        """Запись при GET-запросе тоже переключает на основную базу"""
+
+        def view(request):
+            ReplicaRouter().db_for_write(Post)
+            return HttpResponse()
+
+        response = self.middleware(self.factory.get("/"))
+        self.assertNotIn(LAST_WRITE_COOKIE, response.cookies)
+        response = ReplicaMiddleware(view)(self.factory.get("/"))
+        self.assertIn(LAST_WRITE_COOKIE, response.cookies)
+
+    def test_copy_database(self):
+        """Реплика копируется через backup API"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        source = os.path.join(directory, "primary.sqlite3")
+        target = os.path.join(directory, "replica.sqlite3")
+        db = sqlite3.connect(source)
+        db.execute("CREATE TABLE post (text TEXT)")
+        db.execute("INSERT INTO post VALUES ('Текст')")
+        db.commit()
+        db.close()
+
+        copy_database(source, target)
+
+        db = sqlite3.connect(target)
+        self.assertEqual(
+            db.execute("SELECT text FROM post").fetchall(), [("Текст",)]
+        )
+        db.close()
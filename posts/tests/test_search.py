@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User as AdminUser
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Comment, Post, User
+from posts.search import search
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.post = Post.objects.create(
+            text="Сегодня видел кота на крыше", author=cls.author
+        )
+        cls.other = Post.objects.create(
+            text="Кот, кот и ещё раз кот", author=cls.author
+        )
+        Post.objects.create(text="Про собак", author=cls.author)
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.author, text="Какой хороший кот"
+        )
+
+    def test_search_ranks_by_bm25(self):
+        """Поиск находит посты и ранжирует их по bm25"""
+        response = self.client.get(reverse("search"), {"q": "кот"})
+        self.assertEqual(
+            list(response.context.get("page")), [self.other, self.post]
+        )
+
+    def test_search_follows_updates_and_deletes(self):
+        """Индекс обновляется при изменении и удалении поста"""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = "Теперь про попугая"
+        post.save()
+        _, page = search(Post, "попугая")
+        self.assertEqual(list(page), [post])
+
+        post.delete()
+        _, page = search(Post, "попугая")
+        self.assertEqual(list(page), [])
+
+    def test_search_pages_by_cursor(self):
+        """Результаты поиска листаются курсором"""
+        _, first = search(Post, "кот", per_page=1)
+        _, second = search(Post, "кот", after=first.next_cursor, per_page=1)
+        _, back = search(
+            Post, "кот", before=second.previous_cursor, per_page=1
+        )
+
+        self.assertEqual(list(first) + list(second), [self.other, self.post])
+        self.assertIsNone(second.next_cursor)
+        self.assertEqual(list(back), list(first))
+
+    def test_search_comments(self):
+        """Поиск работает по комментариям"""
+        response = self.client.get(
+            reverse("search"), {"q": "хороший", "in": "comments"}
+        )
+        self.assertEqual(list(response.context.get("page")), [self.comment])
+
+    def test_search_escapes_query_syntax(self):
+        """Служебные символы FTS5 в запросе не ломают поиск"""
+        response = self.client.get(reverse("search"), {"q": 'кот" OR (*'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке использует полнотекстовый индекс"""
+        admin = AdminUser.objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:posts_post_changelist"), {"q": "собак"}
+        )
+        self.assertEqual(response.context["cl"].result_count, 1)
@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import AuthorStats, Comment, Follow, Post, User
+from posts.stats import get_author_stats
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.reader = User.objects.create(username="reader")
+
+    def get_stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_post_counter(self):
+        """Счётчик постов меняется при создании и удалении поста"""
+        post = Post.objects.create(text="Текст", author=self.author)
+        Post.objects.create(text="Ещё текст", author=self.author)
+        self.assertEqual(self.get_stats(self.author).posts_count, 2)
+
+        post.delete()
+        self.assertEqual(self.get_stats(self.author).posts_count, 1)
+
+    def test_follow_counters(self):
+        """Счётчики подписок меняются при подписке и отписке"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.get_stats(self.author).followers_count, 1)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.get_stats(self.author).followers_count, 0)
+        self.assertEqual(self.get_stats(self.reader).following_count, 0)
+
+    def test_missing_stats_are_counted(self):
+        """Отсутствующая статистика считается по данным"""
+        Post.objects.bulk_create([Post(text="Текст", author=self.author)])
+        AuthorStats.objects.all().delete()
+        self.author.refresh_from_db()
+
+        stats = get_author_stats(self.author)
+        self.assertEqual(stats.posts_count, 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        """Команда rebuild_author_stats исправляет расхождения"""
+        Post.objects.create(text="Текст", author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.update(
+            posts_count=10, followers_count=10, following_count=10
+        )
+
+        call_command("rebuild_author_stats", stdout=StringIO())
+
+        stats = self.get_stats(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(stats.following_count, 0)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+
+    def test_user_delete_cascades(self):
+        """Удаление пользователя не оставляет статистику"""
+        reader = User.objects.create(username="another_reader")
+        Follow.objects.create(user=reader, author=self.author)
+        Post.objects.create(text="Текст", author=reader)
+        reader_id = reader.id
+
+        reader.delete()
+        self.assertFalse(
+            AuthorStats.objects.filter(user_id=reader_id).exists()
+        )
+        self.assertEqual(self.get_stats(self.author).followers_count, 0)
+
+
+class CommentsCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+
+    def setUp(self):
+        self.post = Post.objects.create(text="Текст", author=self.author)
+
+    def test_comment_counter(self):
+        """Счётчик комментариев меняется при создании и удалении"""
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text="Комментарий"
+        )
+        Comment.objects.create(
+            post=self.post, author=self.author, text="Ещё комментарий"
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        """Команда rebuild_comments_count исправляет расхождения"""
+        Comment.objects.bulk_create(
+            [Comment(post=self.post, author=self.author, text="Комментарий")]
+        )
+
+        call_command("rebuild_comments_count", stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
@@ -0,0 +1,228 @@
+import threading
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    Client,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.cache import feed_version
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.timeline import _executor, follow_feed
+
+
+@override_settings(TIMELINE_BATCH_SIZE=2, TIMELINE_ASYNC=False)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.readers = [
+            User.objects.create(username=f"reader{i}") for i in range(5)
+        ]
+
+    def follow_all(self):
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.author)
+
+    def test_new_post_fans_out_to_all_followers(self):
+        """Новый пост попадает в ленты всех подписчиков"""
+        self.follow_all()
+        post = Post.objects.create(text="Текст", author=self.author)
+
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=post).count(),
+            len(self.readers),
+        )
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту прошлые посты автора"""
+        for i in range(5):
+            Post.objects.create(text=f"Текст {i}", author=self.author)
+        reader = self.readers[0]
+
+        Follow.objects.create(user=reader, author=self.author)
+        self.assertEqual(reader.timeline.count(), 5)
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает посты автора из ленты"""
+        reader = self.readers[0]
+        Follow.objects.create(user=reader, author=self.author)
+        Post.objects.create(text="Текст", author=self.author)
+
+        Follow.objects.filter(user=reader, author=self.author).delete()
+        self.assertFalse(reader.timeline.exists())
+
+    def test_follow_index_pages_through_timeline(self):
+        """Лента подписок листается курсором"""
+        reader = self.readers[0]
+        client = Client()
+        client.force_login(reader)
+        Follow.objects.create(user=reader, author=self.author)
+        posts = [
+            Post.objects.create(text=f"Текст {i}", author=self.author)
+            for i in range(13)
+        ]
+
+        first = client.get(reverse("follow_index")).context.get("page")
+        second = client.get(
+            reverse("follow_index") + f"?after={first.next_cursor}"
+        ).context.get("page")
+
+        self.assertEqual(
+            list(first) + list(second), sorted(posts, key=lambda p: -p.id)
+        )
+
+
+@override_settings(TIMELINE_BATCH_SIZE=2, TIMELINE_ASYNC=True)
+class DeferredTimelineTests(TransactionTestCase):
+    def test_deferred_batches_bump_feed_version(self):
+        """Фоновая рассылка сбрасывает кэш лент по окончании"""
+        author = User.objects.create(username="author")
+        for i in range(5):
+            reader = User.objects.create(username=f"reader{i}")
+            Follow.objects.create(user=reader, author=author)
+        # Holds the worker until the post's first batch has been read.
+        release = threading.Event()
+        _executor.submit(release.wait)
+
+        post = Post.objects.create(text="Текст", author=author)
+        version = feed_version()
+        self.assertEqual(TimelineEntry.objects.filter(post=post).count(), 2)
+        release.set()
+        _executor.submit(lambda: None).result()
+
+        self.assertEqual(TimelineEntry.objects.filter(post=post).count(), 5)
+        self.assertNotEqual(feed_version(), version)
+
+    def test_unfollow_stops_deferred_backfill(self):
+        """Отписка до фоновой подгрузки не оставляет посты в ленте"""
+        author = User.objects.create(username="author")
+        reader = User.objects.create(username="reader")
+        for i in range(5):
+            Post.objects.create(text=f"Пост {i}", author=author)
+        release = threading.Event()
+        _executor.submit(release.wait)
+
+        Follow.objects.create(user=reader, author=author)
+        self.assertEqual(reader.timeline.count(), 2)
+        Follow.objects.filter(user=reader, author=author).delete()
+        release.set()
+        _executor.submit(lambda: None).result()
+
+        self.assertEqual(reader.timeline.count(), 0)
+
+
+@override_settings(
+    TIMELINE_BATCH_SIZE=2, TIMELINE_ASYNC=False, TIMELINE_CELEBRITY_THRESHOLD=3
+)
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.celebrity = User.objects.create(username="celebrity")
+        cls.author = User.objects.create(username="author")
+        cls.readers = [
+            User.objects.create(username=f"reader{i}") for i in range(3)
+        ]
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.celebrity)
+        Follow.objects.create(user=cls.readers[0], author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.readers[0])
+
+    def test_celebrity_posts_are_not_fanned_out(self):
+        """Посты популярных авторов не копируются в ленты"""
+        post = Post.objects.create(text="Текст", author=self.celebrity)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+    def test_feed_merges_pushed_and_pulled_posts(self):
+        """Лента объединяет посты обычных и популярных авторов"""
+        posts = [
+            Post.objects.create(
+                text=f"Текст {i}",
+                author=self.celebrity if i % 2 else self.author,
+            )
+            for i in range(13)
+        ]
+        expected = sorted(posts, key=lambda p: -p.id)
+
+        first = self.client.get(reverse("follow_index")).context.get("page")
+        second = self.client.get(
+            reverse("follow_index") + f"?after={first.next_cursor}"
+        ).context.get("page")
+        back = self.client.get(
+            reverse("follow_index") + f"?before={second.previous_cursor}"
+        ).context.get("page")
+
+        self.assertEqual(list(first) + list(second), expected)
+        self.assertEqual(list(back), list(first))
+
+    def test_celebrities_read_in_one_query(self):
+        """Число запросов ленты не зависит от числа популярных авторов"""
+        Post.objects.create(text="Текст", author=self.celebrity)
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                follow_feed(self.readers[0])
+            return len(queries)
+
+        one = count_queries()
+        for i in range(2):
+            celebrity = User.objects.create(username=f"celebrity{i}")
+            for reader in self.readers:
+                Follow.objects.create(user=reader, author=celebrity)
+            Post.objects.create(text="Текст", author=celebrity)
+
+        self.assertEqual(len(follow_feed(self.readers[0])[1]), 3)
+        self.assertEqual(count_queries(), one)
+
+    def test_unfollow_below_threshold_pushes_posts(self):
+        """Посты автора, переставшего быть популярным, остаются в ленте"""
+        post = Post.objects.create(text="Текст", author=self.celebrity)
+        feed = self.client.get(reverse("follow_index")).context["page"]
+        self.assertIn(post, feed)
+
+        Follow.objects.filter(
+            user=self.readers[2], author=self.celebrity
+        ).delete()
+
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.readers[0], post=post
+            ).exists()
+        )
+        feed = self.client.get(reverse("follow_index")).context["page"]
+        self.assertIn(post, feed)
+
+    def test_numbered_pages_still_work(self):
+        """Старые ссылки с ?page= продолжают работать"""
+        Post.objects.create(text="Текст", author=self.celebrity)
+        Post.objects.create(text="Текст", author=self.author)
+
+        response = self.client.get(reverse("follow_index") + "?page=1")
+        self.assertEqual(len(response.context.get("page")), 2)
+
+    def test_bench_follow_feed_command(self):
+        """Бенчмарк ленты подписок выполняется и не оставляет данных"""
+        posts_before = Post.objects.count()
+        out = StringIO()
+
+        call_command(
+            "bench_follow_feed",
+            followers=5,
+            authors=5,
+            posts=2,
+            threshold=3,
+            samples=2,
+            stdout=out,
+        )
+
+        self.assertIn("hybrid", out.getvalue())
+        self.assertEqual(Post.objects.count(), posts_before)
@@ -3,19 +3,24 @@ import tempfile
 
 from django import forms
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Follow, Group, Post, User
+from posts.cache import FEED_VERSION_KEY, bump_feed_version
+from posts.models import Comment, Follow, Group, Post, User
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class TestPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
 
-        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
-
         cls.small_gif = (
             b"\x47\x49\x46\x38\x39\x61\x02\x00"
             b"\x01\x00\x80\x00\x00\x00\x00\x00"
@@ -53,7 +58,7 @@ class TestPagesTests(TestCase):
 
     @classmethod
     def tearDownClass(cls):
-        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
         super().tearDownClass()
 
     def setUp(self):
@@ -88,9 +93,8 @@ class TestPagesTests(TestCase):
                 "index",
             )
         )
-        Post.objects.create(
-            text="Тестовый текст для проверки кэша",
-            author=TestPagesTests.author,
+        Post.objects.filter(pk=TestPagesTests.post.pk).update(
+            text="Изменено в обход сигналов"
         )
         index_2 = self.authorized_client.get(
             reverse(
@@ -100,6 +104,42 @@ class TestPagesTests(TestCase):
 
         self.assertHTMLEqual(str(index_1.content), str(index_2.content))
 
+    def test_cache_index_page_invalidated_by_new_post(self):
+        """ Новый пост сразу сбрасывает кэш главной страницы """
+        self.authorized_client.get(reverse("index"))
+        Post.objects.create(
+            text="Тестовый текст для проверки кэша",
+            author=TestPagesTests.author,
+        )
+        response = self.authorized_client.get(reverse("index"))
+
+        self.assertContains(response, "Тестовый текст для проверки кэша")
+
+    def test_cache_index_page_is_page_aware(self):
+        """ Разные страницы главной не делят один кэш """
+        for i in range(settings.PER_PAGE):
+            Post.objects.create(text=f"Пост {i}", author=self.author)
+        self.authorized_client.get(reverse("index"))
+
+        response = self.authorized_client.get(reverse("index") + "?page=2")
+
+        self.assertContains(response, "Тестовый текст")
+
+    def test_cache_index_page_survives_lost_version(self):
+        """ Потерянная версия ленты не возвращает старый кэш """
+        cache.delete(FEED_VERSION_KEY)
+        self.authorized_client.get(reverse("index"))
+        bump_feed_version()
+        Post.objects.create(
+            text="Пост после сброса версии", author=TestPagesTests.author
+        )
+        cache.delete(FEED_VERSION_KEY)
+        bump_feed_version()
+
+        response = self.authorized_client.get(reverse("index"))
+
+        self.assertContains(response, "Пост после сброса версии")
+
     # Context tests
     def test_index_page_shows_correct_context(self):
         """Шаблон index_page сформирован с правильным контекстом"""
@@ -326,3 +366,332 @@ class PaginatorViewsTest(TestCase):
         """Количество постов на второй странице равно 3"""
         response = self.client.get(reverse("index") + "?page=2")
         self.assertEqual(len(response.context.get("page").object_list), 3)
+
+    def test_cursor_next_page_containse_three_records(self):
+        """Курсор ?after= ведёт на следующую страницу"""
+        response = self.client.get(reverse("index"))
+        next_cursor = response.context.get("page").next_cursor
+        self.assertIsNotNone(next_cursor)
+
+        response = self.client.get(reverse("index") + f"?after={next_cursor}")
+        page = response.context.get("page")
+        self.assertEqual(len(page.object_list), 3)
+        self.assertIsNone(page.next_cursor)
+        self.assertIsNotNone(page.previous_cursor)
+
+    def test_cursor_previous_page_returns_first_page(self):
+        """Курсор ?before= возвращает на предыдущую страницу"""
+        first = self.client.get(reverse("index")).context.get("page")
+        second = self.client.get(
+            reverse("index") + f"?after={first.next_cursor}"
+        ).context.get("page")
+
+        response = self.client.get(
+            reverse("index") + f"?before={second.previous_cursor}"
+        )
+        page = response.context.get("page")
+        self.assertSequenceEqual(page.object_list, first.object_list)
+        self.assertIsNone(page.previous_cursor)
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Некорректный курсор показывает первую страницу"""
+        response = self.client.get(reverse("index") + "?after=broken")
+        self.assertEqual(len(response.context.get("page").object_list), 10)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            text="Текст", author=cls.author, group=cls.group
+        )
+        cls.urls = (
+            reverse("group", args=[cls.group.slug]),
+            reverse("profile", args=[cls.author.username]),
+            reverse("post", args=[cls.author.username, cls.post.id]),
+        )
+
+    def assertNotModified(self, url, response, modified=False):
+        status = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response["ETag"]
+        ).status_code
+        self.assertEqual(status, 200 if modified else 304)
+
+    def test_unchanged_pages_return_304(self):
+        """Неизменённые страницы возвращают 304 по ETag"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertNotModified(url, response)
+
+    def test_if_modified_since_alone(self):
+        """Запрос только с If-Modified-Since видит новый комментарий"""
+        url = self.urls[2]
+        self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text="Новый комментарий"
+        )
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE="Sun, 01 Jan 2090 00:00:00 GMT"
+        )
+        self.assertContains(response, "Новый комментарий")
+
+    def test_unrelated_writes_keep_pages(self):
+        """Записи на других страницах не меняют ETag"""
+        responses = {url: self.client.get(url) for url in self.urls}
+        other = User.objects.create(username="other")
+        post = Post.objects.create(text="Другой пост", author=other)
+        Comment.objects.create(post=post, author=other, text="Комментарий")
+        Follow.objects.create(
+            user=other, author=User.objects.create(username="third")
+        )
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertNotModified(url, response)
+
+    def test_changes_invalidate_pages(self):
+        """Новые, изменённые и удалённые записи меняют ETag"""
+        responses = {url: self.client.get(url) for url in self.urls}
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text="Комментарий"
+        )
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertNotModified(url, response, modified=True)
+
+        responses = {url: self.client.get(url) for url in self.urls}
+        comment.delete()
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertNotModified(url, response, modified=True)
+
+    def test_group_rename_invalidates_pages(self):
+        """Переименование группы меняет ETag страниц с её постами"""
+        responses = {url: self.client.get(url) for url in self.urls}
+        self.group.title = "Новое название"
+        self.group.save()
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertNotModified(url, response, modified=True)
+
+    def test_cache_control(self):
+        """Анонимные страницы публичные, остальные проверяются заново"""
+        url = self.urls[0]
+        response = self.client.get(url)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn(
+            f"max-age={settings.PAGE_CACHE_MAX_AGE}", response["Cache-Control"]
+        )
+
+        self.client.force_login(self.author)
+        response = self.client.get(url)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertNotModified(url, response)
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.post = Post.objects.create(text="Текст", author=cls.author)
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create(username=f"reader{i}"),
+                text=f"Комментарий {i}",
+            )
+            for i in range(7)
+        ]
+
+    def test_post_page_shows_first_comments(self):
+        """Страница поста показывает первые комментарии, старые первыми"""
+        response = self.client.get(
+            reverse("post", args=[self.author.username, self.post.id])
+        )
+        self.assertEqual(
+            list(response.context["comments"]), self.comments[:3]
+        )
+        self.assertIsNotNone(response.context["comments_cursor"])
+        self.assertContains(response, "Показать ещё")
+
+    def test_load_more_pages_by_cursor(self):
+        """Кнопка «Показать ещё» подгружает следующие комментарии"""
+        url = reverse(
+            "post_comments", args=[self.author.username, self.post.id]
+        )
+        loaded = []
+        cursor = None
+        for _ in range(3):
+            params = {"after": cursor} if cursor else {}
+            response = self.client.get(url, params)
+            self.assertTemplateUsed(response, "includes/comment_list.html")
+            loaded += response.context["comments"]
+            cursor = response.context["comments_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(loaded, self.comments)
+        self.assertIsNone(cursor)
+
+    def test_comment_authors_in_one_query(self):
+        """Авторы комментариев читаются одним запросом с комментариями"""
+        url = reverse(
+            "post_comments", args=[self.author.username, self.post.id]
+        )
+        # The post, a batch of comments with their authors, and whether
+        # there are more.
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+
+@override_settings(PER_PAGE=1, PAGE_WINDOW=3)
+class WindowedPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        for i in range(20):
+            Post.objects.create(text=f"Пост {i}", author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def count_queries(self, url, page):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"page": page})
+        counts = [q for q in queries if "SELECT COUNT(*)" in q["sql"]]
+        return response, len(counts)
+
+    def test_window_around_current_page(self):
+        """Ссылки только на соседние, первую и последнюю страницы"""
+        response, _ = self.count_queries(reverse("index"), 10)
+        page = response.context["page"]
+
+        self.assertEqual(list(page.window), [9, 10, 11])
+        for number in (1, 9, 11, 20):
+            self.assertContains(response, f"page={number}\"")
+        for number in (2, 8, 12, 19):
+            self.assertNotContains(response, f"page={number}\"")
+
+    def test_window_at_the_edges(self):
+        """Окно не выходит за первую и последнюю страницы"""
+        response, _ = self.count_queries(reverse("index"), 1)
+        self.assertEqual(list(response.context["page"].window), [1, 2, 3])
+        response, _ = self.count_queries(reverse("index"), 20)
+        self.assertEqual(
+            list(response.context["page"].window), [18, 19, 20]
+        )
+
+    def test_count_is_cached(self):
+        """Число постов считается один раз, пока лента не изменится"""
+        _, counts = self.count_queries(reverse("index"), 2)
+        self.assertEqual(counts, 1)
+        _, counts = self.count_queries(reverse("index"), 3)
+        self.assertEqual(counts, 0)
+
+        Post.objects.create(text="Новый пост", author=self.author)
+        response, counts = self.count_queries(reverse("index"), 3)
+        self.assertEqual(counts, 1)
+        self.assertEqual(response.context["paginator"].num_pages, 21)
+
+    def test_profile_count_from_stats(self):
+        """Профиль берёт число постов из счётчика автора"""
+        _, counts = self.count_queries(
+            reverse("profile", args=[self.author.username]), 2
+        )
+        self.assertEqual(counts, 0)
+
+
+class PostFragmentCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.reader = User.objects.create(username="reader")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text="Исходный текст", author=self.author, group=self.group
+        )
+
+    def change_quietly(self):
+        # Changes the text without touching updated_at, then moves the
+        # feeds on so only the post fragment can still hold the old text.
+        Post.objects.filter(pk=self.post.pk).update(text="Новый текст")
+        Post.objects.create(text="Другой пост", author=self.reader)
+
+    def test_fragment_shared_between_pages(self):
+        """Карточка поста отрисовывается один раз для всех лент"""
+        self.client.get(reverse("index"))
+        self.change_quietly()
+
+        for url in (
+            reverse("index"),
+            reverse("group", args=[self.group.slug]),
+            reverse("profile", args=[self.author.username]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, "Исходный текст")
+                self.assertNotContains(response, "Новый текст")
+
+    def test_fragment_invalidated_by_edit(self):
+        """Изменение поста обновляет его карточку"""
+        self.client.get(reverse("index"))
+        self.post.text = "Отредактированный текст"
+        self.post.save()
+
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, "Отредактированный текст")
+
+    def test_fragment_invalidated_by_comment(self):
+        """Новый комментарий обновляет счётчик на карточке"""
+        self.client.get(reverse("index"))
+        Comment.objects.create(
+            post=self.post, author=self.reader, text="Комментарий"
+        )
+
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, "Комментариев: 1")
+
+    def test_fragment_invalidated_by_group_rename(self):
+        """Переименование группы обновляет карточки её постов"""
+        self.client.get(reverse("index"))
+        self.group.title = "Новое название"
+        self.group.save()
+
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, "#Новое название")
+
+    def test_edit_button_does_not_split_cache(self):
+        """Кнопка редактирования видна автору без отдельного кэша"""
+        author = Client()
+        author.force_login(self.author)
+        reader = Client()
+        reader.force_login(self.reader)
+        author.get(reverse("index"))
+        self.change_quietly()
+
+        author_page = author.get(reverse("index"))
+        reader_page = reader.get(reverse("index"))
+
+        for response in (author_page, reader_page):
+            self.assertContains(response, "Исходный текст")
+            self.assertContains(
+                response, 'class="btn btn-sm btn-info post-edit"'
+            )
+        self.assertContains(author_page, '[data-author="author"] .post-edit')
+        self.assertNotContains(
+            reader_page, '[data-author="author"] .post-edit'
+        )
@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+from sorl.thumbnail import get_thumbnail
+
+from .models import ImageVariant, Post
+from .page_cache import invalidate_pages, post_tags
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbnail")
+
+FORMATS = {
+    ImageVariant.JPEG: ("JPEG", "jpg"),
+    ImageVariant.WEBP: ("WEBP", "webp"),
+}
+
+
+def generate_thumbnails(name):
+    """Render every geometry in POST_THUMBNAILS for one image."""
+    for geometry, options in settings.POST_THUMBNAILS:
+        get_thumbnail(name, geometry, **options)
+    return len(settings.POST_THUMBNAILS)
+
+
+def generate_variants(post_id):
+    """Render POST_IMAGE_WIDTHS crops of a post image as JPEG and WebP.
+
+    The files and their sizes are recorded as ImageVariant rows, so
+    rendering a feed never has to touch the filesystem.
+    """
+    post = (
+        Post.objects.filter(pk=post_id)
+        .only("image", "author", "group")
+        .first()
+    )
+    if post is None or not post.image:
+        return 0
+    with default_storage.open(post.image.name) as file:
+        source = Image.open(file)
+        source.load()
+    source = source.convert("RGB")
+
+    formats = [ImageVariant.JPEG]
+    if features.check("webp"):
+        formats.append(ImageVariant.WEBP)
+    ratio_width, ratio_height = settings.POST_IMAGE_ASPECT
+
+    variants = []
+    for width in settings.POST_IMAGE_WIDTHS:
+        height = round(width * ratio_height / ratio_width)
+        image = ImageOps.fit(source, (width, height), Image.LANCZOS)
+        for image_format in formats:
+            pil_format, extension = FORMATS[image_format]
+            buffer = BytesIO()
+            image.save(buffer, pil_format, quality=settings.POST_IMAGE_QUALITY)
+            name = default_storage.save(
+                f"variants/{post_id}/{width}.{extension}",
+                ContentFile(buffer.getvalue()),
+            )
+            variants.append(
+                ImageVariant(
+                    post_id=post_id,
+                    name=name,
+                    format=image_format,
+                    width=width,
+                    height=height,
+                )
+            )
+
+    with transaction.atomic():
+        stale = ImageVariant.objects.filter(post_id=post_id)
+        for name in stale.values_list("name", flat=True):
+            default_storage.delete(name)
+        stale.delete()
+        ImageVariant.objects.bulk_create(variants)
+        # The post page renders the new variants, so it has changed.
+        Post.objects.filter(pk=post_id).update(updated_at=timezone.now())
+        invalidate_pages(*post_tags(post))
+    return len(variants)
+
+
+def prepare_images(post_id, name):
+    generate_variants(post_id)
+    generate_thumbnails(name)
+
+
+def _prepare_in_worker(post_id, name):
+    try:
+        prepare_images(post_id, name)
+    finally:
+        connections.close_all()
+
+
+def schedule_images(post):
+    """Pre-generate image variants after commit, off the request thread."""
+    if not settings.POST_THUMBNAILS_ASYNC:
+        prepare_images(post.pk, post.image.name)
+        return
+    post_id, name = post.pk, post.image.name
+    transaction.on_commit(
+        lambda: _executor.submit(_prepare_in_worker, post_id, name)
+    )
@@ -0,0 +1,236 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Q
+
+from .cache import bump_feed_version
+from .db import retry_atomic
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .pagination import make_page, read_cursors, seek, seek_each
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="timeline")
+
+
+def _run_in_worker(func, *args):
+    try:
+        func(*args)
+        # Feed fragments and ETags cached while the batches were being
+        # written show half-filled timelines.
+        bump_feed_version()
+    finally:
+        connections.close_all()
+
+
+def _defer(func, *args):
+    """Run the remaining batches after commit on the timeline worker."""
+    if not settings.TIMELINE_ASYNC:
+        func(*args)
+        return
+    transaction.on_commit(
+        lambda: _executor.submit(_run_in_worker, func, *args)
+    )
+
+
+def is_celebrity(author_id):
+    """Celebrities' posts are pulled at read time instead of fanned out."""
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.TIMELINE_CELEBRITY_THRESHOLD,
+    ).exists()
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out_post(post_id, author_id, pub_date, after=0, inline_batches=1):
+    """Copy a new post into its author's followers' timelines.
+
+    Followers are walked by id in ``TIMELINE_BATCH_SIZE`` batches. The
+    first ``inline_batches`` are written by the caller, the rest go to the
+    background worker so the request that created the post isn't held up.
+    """
+    size = settings.TIMELINE_BATCH_SIZE
+    done = 0
+    while True:
+        user_ids = list(
+            Follow.objects.filter(author_id=author_id, user_id__gt=after)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)[:size]
+        )
+        _insert(
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for user_id in user_ids
+        )
+        if len(user_ids) < size:
+            return
+        after = user_ids[-1]
+        done += 1
+        if inline_batches is not None and done >= inline_batches:
+            _defer(fan_out_post, post_id, author_id, pub_date, after, None)
+            return
+
+
+def _backfill_batch(user_id, author_id, before, size):
+    # A deferred batch may run after an unfollow pruned the timeline; in
+    # one transaction with the check, the insert can't land after it.
+    if not Follow.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).exists():
+        return []
+    posts = Post.objects.filter(author_id=author_id)
+    if before is not None:
+        posts = posts.filter(id__lt=before)
+    rows = list(posts.order_by("-id").values_list("id", "pub_date")[:size])
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in rows
+    )
+    return rows
+
+
+def backfill_timeline(user_id, author_id, before=None, inline_batches=1):
+    """Copy an author's posts into a new follower's timeline, newest first.
+
+    Batches stop once the user no longer follows the author.
+    """
+    size = settings.TIMELINE_BATCH_SIZE
+    done = 0
+    while True:
+        rows = retry_atomic(_backfill_batch, user_id, author_id, before, size)
+        if len(rows) < size:
+            return
+        before = rows[-1][0]
+        done += 1
+        if inline_batches is not None and done >= inline_batches:
+            _defer(backfill_timeline, user_id, author_id, before, None)
+            return
+
+
+def push_author_posts(author_id):
+    """Copy all of an author's posts into every follower's timeline."""
+    entries = Follow.objects.filter(
+        author_id=author_id, author__author_posts__isnull=False
+    ).values_list(
+        "user_id", "author__author_posts__id", "author__author_posts__pub_date"
+    )
+    sql, params = entries.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT OR IGNORE INTO {TimelineEntry._meta.db_table} "
+            f"(user_id, post_id, pub_date) {sql}",
+            params,
+        )
+
+
+def demote_celebrity(author_id):
+    """Push an author's posts once an unfollow drops them below the
+    celebrity threshold.
+
+    Their posts were pulled at read time and never fanned out, so without
+    this they would vanish from the remaining followers' feeds.
+    """
+    if AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count=settings.TIMELINE_CELEBRITY_THRESHOLD - 1,
+    ).exists():
+        _defer(push_author_posts, author_id)
+
+
+def prune_timeline(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild_timeline():
+    """Refill every timeline with one INSERT ... SELECT over all follows."""
+    follows = Follow.objects.filter(
+        Q(author__stats__isnull=True)
+        | Q(
+            author__stats__followers_count__lt=(
+                settings.TIMELINE_CELEBRITY_THRESHOLD
+            )
+        )
+    )
+    entries = follows.filter(author__author_posts__isnull=False).values_list(
+        "user_id", "author__author_posts__id", "author__author_posts__pub_date"
+    )
+    sql, params = entries.query.sql_with_params()
+    with transaction.atomic(), connection.cursor() as cursor:
+        TimelineEntry.objects.all().delete()
+        cursor.execute(
+            f"INSERT INTO {TimelineEntry._meta.db_table} "
+            f"(user_id, post_id, pub_date) {sql}",
+            params,
+        )
+    return follows.count()
+
+
+def follow_feed(user, after=None, before=None, per_page=None, images=True):
+    """Build a page of the follow feed from pushed and pulled posts.
+
+    Posts by ordinary authors are read from the user's materialized
+    timeline; posts by followed celebrities are read from each author's
+    posts, all in one query. Both streams are already sorted by
+    ``(pub_date, id)`` and are k-way merged, so every source reads at most
+    ``per_page + 1`` keys.
+    The merged page's posts are then loaded with ``for_feed()``.
+    """
+    per_page = per_page or settings.PER_PAGE
+    cursor, newer = read_cursors(after, before)
+    limit = per_page + 1
+
+    streams = [
+        seek(
+            user.timeline.values_list("pub_date", "post_id"),
+            cursor,
+            newer,
+            limit,
+            tiebreaker="post_id",
+        )
+    ]
+    celebrities = Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gte=(
+            settings.TIMELINE_CELEBRITY_THRESHOLD
+        ),
+    ).values_list("author_id", flat=True)
+    streams.append(
+        seek_each(
+            [Post.objects.filter(author_id=pk) for pk in celebrities],
+            cursor,
+            newer,
+            limit,
+        )
+    )
+
+    rows = []
+    seen = set()
+    merged = heapq.merge(*streams, key=itemgetter(0, 1), reverse=not newer)
+    for row in merged:
+        if row[1] in seen:
+            continue
+        seen.add(row[1])
+        rows.append(row)
+        if len(rows) == limit:
+            break
+
+    posts = (
+        Post.objects.for_feed(images)
+        .order_by()
+        .in_bulk([post_id for _, post_id in rows])
+    )
+    # Posts deleted since their keys were read are skipped.
+    rows = [row for row in rows if row[1] in posts]
+    return make_page(
+        rows,
+        per_page,
+        newer,
+        cursor is not None,
+        itemgetter(0, 1),
+        lambda row: posts[row[1]],
+    )
@@ -5,13 +5,23 @@ from . import views
 urlpatterns = [
     path("", views.index, name="index"),
     path("group/<slug:slug>/", views.group_posts, name="group"),
+    path("group/<slug:slug>/export/", views.group_export, name="group_export"),
     path("new/", views.new_post, name="new_post"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
     path("<str:username>/", views.profile, name="profile"),
+    path(
+        "<str:username>/export/", views.profile_export, name="profile_export"
+    ),
     path("<str:username>/<int:post_id>/", views.post_view, name="post"),
     path(
         "<str:username>/<int:post_id>/edit/", views.post_edit, name="post_edit"
     ),
+    path(
+        "<str:username>/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments",
+    ),
     path(
         "<str:username>/<int:post_id>/comment/",
         views.add_comment,
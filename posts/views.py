@@ -1,19 +1,44 @@
+from urllib.parse import urlencode
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_safe
+
+from yatube.metrics import query_budget
 
+from . import feeds
+from .cache import cached_count, feed_cache_key
+from .conditional import conditional_page
+from .db import retry_atomic, retry_save
+from .export import FORMATS, export, filename
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
+from .page_cache import (
+    cached_page,
+    group_page_tags,
+    index_page_tags,
+    post_page_tags,
+    profile_page_tags,
+)
+from .pagination import load_more, paginate
+from .search import search as search_index
+from .stats import get_author_stats
+from .timeline import follow_feed
 from .utils import is_following
 
 
+@query_budget(25)
+@cached_page(index_page_tags)
 def index(request):
-    post_list = Post.objects.select_related("group")
+    post_list = feeds.index_posts()
 
-    paginator = Paginator(post_list, settings.PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    paginator, page = paginate(
+        request,
+        post_list.for_feed(),
+        count=lambda: cached_count("index", post_list),
+    )
 
     return render(
         request,
@@ -21,17 +46,23 @@ def index(request):
         {
             "page": page,
             "paginator": paginator,
+            "feed_key": feed_cache_key(request, "index"),
         },
     )
 
 
+@query_budget(25)
+@cached_page(group_page_tags)
+@conditional_page(group_page_tags)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.group_posts.all()
+    posts = feeds.group_posts(group)
 
-    paginator = Paginator(posts, settings.PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    paginator, page = paginate(
+        request,
+        posts.for_feed(),
+        count=lambda: cached_count(f"group:{group.pk}", posts),
+    )
 
     return render(
         request,
@@ -40,59 +71,123 @@ def group_posts(request, slug):
             "group": group,
             "page": page,
             "paginator": paginator,
+            "feed_key": feed_cache_key(request, "group", group.pk),
+        },
+    )
+
+
+@query_budget(10)
+def search(request):
+    query = request.GET.get("q", "").strip()
+    scope = "comments" if request.GET.get("in") == "comments" else "posts"
+    model = Comment if scope == "comments" else Post
+
+    paginator, page = search_index(
+        model,
+        query,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+    )
+
+    return render(
+        request,
+        "search.html",
+        {
+            "query": query,
+            "in_comments": model is Comment,
+            "page": page,
+            "paginator": paginator,
+            "page_query": urlencode({"q": query, "in": scope}) + "&",
         },
     )
 
 
+def _export_response(request, posts, name):
+    file_format = request.GET.get("format")
+    if file_format not in FORMATS:
+        file_format = "jsonl"
+    compress = request.GET.get("gzip") == "1"
+
+    response = StreamingHttpResponse(
+        export(posts, file_format, compress),
+        content_type="application/gzip" if compress else FORMATS[file_format],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename(name, file_format, compress)}"'
+    )
+    return response
+
+
+@login_required
+def group_export(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _export_response(request, feeds.group_posts(group), slug)
+
+
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    return _export_response(request, feeds.author_posts(author), username)
+
+
 @login_required
 def new_post(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
-        post = form.save(commit=False)
-        post.author = request.user
-        post.save()
+        form.instance.author = request.user
+        form.save_image()
+        retry_save(form.instance, form.save)
         return redirect("index")
 
     return render(request, "new.html", {"form": form})
 
 
+@query_budget(20)
+@cached_page(profile_page_tags)
+@conditional_page(profile_page_tags)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.author_posts.all()
-    count = posts.count()
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
+    posts = feeds.author_posts(author)
+    stats = get_author_stats(author)
 
-    paginator = Paginator(posts, settings.PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    paginator, page = paginate(
+        request, posts.for_feed(), count=lambda: stats.posts_count
+    )
 
     following = is_following(request.user, author)
 
-    following_number = author.following.count()
-    followers_number = author.follower.count()
-
     return render(
         request,
         "profile.html",
         {
             "author": author,
-            "count": count,
+            "stats": stats,
+            "count": stats.posts_count,
             "page": page,
             "paginator": paginator,
+            "feed_key": feed_cache_key(request, "profile", author.pk),
             "following": following,
-            "followers_number": followers_number,
-            "following_number": following_number,
         },
     )
 
 
+@query_budget(12)
+@cached_page(post_page_tags)
+@conditional_page(post_page_tags)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats"),
+        author__username=username,
+        id=post_id,
+    )
     author = post.author
-    count = author.author_posts.count()
-    comments = post.comments.all()
-
-    following_number = author.following.count()
-    followers_number = author.follower.count()
+    stats = get_author_stats(author)
+    comments, comments_cursor = load_more(
+        post.comments.select_related("author"),
+        per_page=settings.COMMENTS_PER_PAGE,
+    )
 
     form = CommentForm(request.POST or None)
 
@@ -102,12 +197,38 @@ def post_view(request, username, post_id):
         {
             "post": post,
             "author": author,
-            "count": count,
+            "stats": stats,
+            "count": stats.posts_count,
             "post_id": post_id,
             "comments": comments,
+            "comments_cursor": comments_cursor,
             "form": form,
-            "followers_number": followers_number,
-            "following_number": following_number,
+        },
+    )
+
+
+@query_budget(5)
+@require_safe
+def post_comments(request, username, post_id):
+    """The next batch of a post's comments, as an HTML fragment."""
+    post = get_object_or_404(
+        Post.objects.select_related("author"),
+        author__username=username,
+        id=post_id,
+    )
+    comments, comments_cursor = load_more(
+        post.comments.select_related("author"),
+        after=request.GET.get("after"),
+        per_page=settings.COMMENTS_PER_PAGE,
+    )
+
+    return render(
+        request,
+        "includes/comment_list.html",
+        {
+            "post": post,
+            "comments": comments,
+            "comments_cursor": comments_cursor,
         },
     )
 
@@ -124,8 +245,8 @@ def post_edit(request, username, post_id):
         request.POST or None, files=request.FILES or None, instance=post
     )
     if form.is_valid():
-        post = form.save(commit=False)
-        post.save()
+        form.save_image()
+        retry_atomic(form.save)
         return redirect("post", username=author.username, post_id=post_id)
 
     return render(
@@ -149,9 +270,12 @@ def server_error(request):
 
 @login_required
 def add_comment(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats"),
+        author__username=username,
+        id=post_id,
+    )
     author = post.author
-    count = author.author_posts.count()
 
     form = CommentForm(request.POST or None)
 
@@ -159,9 +283,11 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        retry_save(comment)
         return redirect("post", username=author.username, post_id=post_id)
 
+    stats = get_author_stats(author)
+
     return render(
         request,
         "post.html",
@@ -169,18 +295,28 @@ def add_comment(request, username, post_id):
             "form": form,
             "post": post,
             "author": author,
-            "count": count,
+            "stats": stats,
+            "count": stats.posts_count,
         },
     )
 
 
+@query_budget(25)
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-
-    paginator = Paginator(post_list, settings.PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    if "page" in request.GET:
+        post_list = feeds.followed_posts(request.user)
+        paginator, page = paginate(
+            request,
+            post_list.for_feed(),
+            count=lambda: cached_count(f"follow:{request.user.pk}", post_list),
+        )
+    else:
+        paginator, page = follow_feed(
+            request.user,
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+        )
 
     return render(
         request,
@@ -188,6 +324,7 @@ def follow_index(request):
         {
             "page": page,
             "paginator": paginator,
+            "feed_key": feed_cache_key(request, "follow", request.user.pk),
         },
     )
 
@@ -197,7 +334,9 @@ def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
 
     if author != request.user:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        retry_atomic(
+            Follow.objects.get_or_create, user=request.user, author=author
+        )
 
     return redirect("profile", username=username)
 
@@ -207,6 +346,8 @@ def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
 
     if author != request.user:
-        Follow.objects.filter(user=request.user, author=author).delete()
+        retry_atomic(
+            Follow.objects.filter(user=request.user, author=author).delete
+        )
 
     return redirect("profile", username=username)
@@ -1,4 +1,14 @@
+import pytest
+
+from yatube.test_runner import isolated_settings
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(scope='session', autouse=True)
+def yatube_test_settings(tmp_path_factory):
+    with isolated_settings(str(tmp_path_factory.mktemp('cache'))):
+        yield
@@ -0,0 +1,198 @@
+import itertools
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Reads refresh an entry's LRU position at most this often, so a hot key
+# doesn't turn every get into a write.
+ACCESS_RESOLUTION = 1.0
+
+
+class SQLiteCache(BaseCache):
+    """Cache shared by all processes on the host through one SQLite file.
+
+    The file is opened in WAL mode, so readers don't block the writer.
+    Entries past MAX_ENTRIES are evicted least recently used first, checked
+    every MAX_ENTRIES / 100 writes of a process, and ``incr`` runs in an
+    immediate transaction, which makes it atomic across processes.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self._local = threading.local()
+        # Counting the table scans it, so the size is only checked every
+        # so many writes and may run over by about a percent meanwhile.
+        self._cull_interval = max(1, self._max_entries // 100)
+        self._writes = itertools.count()
+
+    @property
+    def _db(self):
+        # Connections can't cross a fork, so they are kept per process.
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.db = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.db
+
+    def _connect(self):
+        directory = os.path.dirname(self.location)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.location, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "expires REAL, accessed REAL NOT NULL) WITHOUT ROWID"
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)"
+        )
+        return db
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        row = self._db.execute(
+            "SELECT value, expires, accessed FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            self._db.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?", (key, now)
+            )
+            return default
+        if now - accessed > ACCESS_RESOLUTION:
+            self._db.execute(
+                "UPDATE cache SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires, accessed) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                key,
+                self._dumps(value),
+                self.get_backend_timeout(timeout),
+                time.time(),
+            ),
+        )
+        self._cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?", (key, now)
+            )
+            added = db.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    key,
+                    self._dumps(value),
+                    self.get_backend_timeout(timeout),
+                    now,
+                ),
+            ).rowcount
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        if added:
+            self._cull()
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(
+            self._db.execute(
+                "UPDATE cache SET expires = ? "
+                "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (self.get_backend_timeout(timeout), key, time.time()),
+            ).rowcount
+        )
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT value FROM cache WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                "UPDATE cache SET value = ? WHERE key = ?",
+                (self._dumps(value), key),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return value
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return (
+            self._db.execute(
+                "SELECT 1 FROM cache WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+            is not None
+        )
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._db.execute("DELETE FROM cache", ())
+
+    def _dumps(self, value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _cull(self):
+        """Drop expired entries, then the least recently used ones."""
+        if next(self._writes) % self._cull_interval:
+            return
+        db = self._db
+        (count,) = db.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count <= self._max_entries:
+            return
+        db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        (count,) = db.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute("DELETE FROM cache")
+            return
+        evict = max(count - self._max_entries, count // self._cull_frequency)
+        db.execute(
+            "DELETE FROM cache WHERE key IN "
+            "(SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+            (evict,),
+        )
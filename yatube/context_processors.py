@@ -1,6 +1,12 @@
 import datetime as dt
 
+from django.conf import settings
+
 
 def year(request):
     y = dt.datetime.now()
     return {"year": y.year}
+
+
+def feed_cache(request):
+    return {"feed_cache_timeout": settings.FEED_CACHE_TIMEOUT}
@@ -0,0 +1,290 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+UNRESOLVED = "<unresolved>"
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(queries):
+    """Cap the number of SQL queries a view may run per request.
+
+    Going over is logged, or raised if QUERY_BUDGET_STRICT is on, as it
+    is under the test runner.
+    """
+
+    def decorator(view):
+        view.query_budget = queries
+        return view
+
+    return decorator
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.buckets = [0] * len(settings.METRICS_LATENCY_BUCKETS)
+        self.duration = 0.0
+        self.queries = 0
+        self.db_duration = 0.0
+        self.over_budget = 0
+
+
+def merge(totals, metrics):
+    for name, value in metrics.items():
+        if name == "buckets":
+            totals[name] = [a + b for a, b in zip(totals[name], value)]
+        else:
+            totals[name] += value
+
+
+class Registry:
+    """Metrics keyed by URL name.
+
+    Each process counts its own requests and writes them to a file of its
+    own in METRICS_DIR at most every METRICS_FLUSH_INTERVAL seconds;
+    ``render`` sums the files, so a scrape sees every worker of a server.
+    Files of exited workers are kept, so the sums never go down.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(ViewMetrics)
+        self.pid = None
+        self.flushed_at = 0.0
+
+    def _check_process(self):
+        # A forked worker starts its own count in a file of its own; a
+        # pid alone may be reused by a later worker.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.name = f"{self.pid}-{uuid.uuid4().hex}.json"
+            self.views = defaultdict(ViewMetrics)
+
+    def record(self, view, duration, queries, db_duration, over_budget):
+        bucket = bisect_left(settings.METRICS_LATENCY_BUCKETS, duration)
+        with self.lock:
+            self._check_process()
+            metrics = self.views[view]
+            metrics.requests += 1
+            if bucket < len(metrics.buckets):
+                metrics.buckets[bucket] += 1
+            metrics.duration += duration
+            metrics.queries += queries
+            metrics.db_duration += db_duration
+            metrics.over_budget += over_budget
+            if (
+                time.monotonic() - self.flushed_at
+                >= settings.METRICS_FLUSH_INTERVAL
+            ):
+                self._flush()
+
+    def snapshot(self):
+        with self.lock:
+            self._check_process()
+            return {
+                view: vars(metrics).copy()
+                for view, metrics in self.views.items()
+            }
+
+    def _flush(self):
+        if not settings.METRICS_DIR:
+            return
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, self.name)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump({view: vars(m) for view, m in self.views.items()}, file)
+        os.replace(temporary, path)
+        self.flushed_at = time.monotonic()
+
+    def collect(self):
+        """Metrics of every process writing to METRICS_DIR, summed."""
+        if not settings.METRICS_DIR:
+            return self.snapshot()
+        with self.lock:
+            self._check_process()
+            self._flush()
+        totals = {}
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, "*.json")):
+            try:
+                with open(path) as file:
+                    views = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for view, metrics in views.items():
+                if view in totals:
+                    merge(totals[view], metrics)
+                else:
+                    totals[view] = metrics
+        return totals
+
+    def render(self):
+        """Metrics in the Prometheus text exposition format."""
+        views = sorted(self.collect().items())
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        family(
+            "yatube_requests_total",
+            "counter",
+            "Requests handled, by URL name.",
+            [
+                f'yatube_requests_total{{view="{view}"}} {m["requests"]}'
+                for view, m in views
+            ],
+        )
+        samples = []
+        for view, m in views:
+            cumulative = 0
+            for bound, count in zip(
+                settings.METRICS_LATENCY_BUCKETS, m["buckets"]
+            ):
+                cumulative += count
+                samples.append(
+                    f"yatube_request_duration_seconds_bucket"
+                    f'{{view="{view}",le="{bound}"}} {cumulative}'
+                )
+            samples += [
+                f"yatube_request_duration_seconds_bucket"
+                f'{{view="{view}",le="+Inf"}} {m["requests"]}',
+                f"yatube_request_duration_seconds_sum"
+                f'{{view="{view}"}} {m["duration"]:.6f}',
+                f"yatube_request_duration_seconds_count"
+                f'{{view="{view}"}} {m["requests"]}',
+            ]
+        family(
+            "yatube_request_duration_seconds",
+            "histogram",
+            "Request latency, by URL name.",
+            samples,
+        )
+        family(
+            "yatube_db_queries_total",
+            "counter",
+            "SQL queries run, by URL name.",
+            [
+                f'yatube_db_queries_total{{view="{view}"}} {m["queries"]}'
+                for view, m in views
+            ],
+        )
+        family(
+            "yatube_db_duration_seconds_total",
+            "counter",
+            "Time spent in SQL queries, by URL name.",
+            [
+                f"yatube_db_duration_seconds_total"
+                f'{{view="{view}"}} {m["db_duration"]:.6f}'
+                for view, m in views
+            ],
+        )
+        family(
+            "yatube_query_budget_exceeded_total",
+            "counter",
+            "Requests that ran more queries than their view's budget.",
+            [
+                f"yatube_query_budget_exceeded_total"
+                f'{{view="{view}"}} {m["over_budget"]}'
+                for view, m in views
+            ],
+        )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.queries += 1
+
+
+class MetricsMiddleware:
+    """Record latency, query count and DB time for every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(counter)
+                )
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        budget = getattr(match.func, "query_budget", None) if match else None
+        over_budget = budget is not None and counter.queries > budget
+        registry.record(
+            view, duration, counter.queries, counter.duration, over_budget
+        )
+        if over_budget:
+            message = (
+                f"{view} ran {counter.queries} queries, "
+                f"its budget is {budget}"
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+def has_metrics_access(request):
+    if request.user.is_staff:
+        return True
+    scheme, _, token = request.META.get("HTTP_AUTHORIZATION", "").partition(
+        " "
+    )
+    return bool(
+        settings.METRICS_TOKEN
+        and scheme == "Bearer"
+        and constant_time_compare(token, settings.METRICS_TOKEN)
+    )
+
+
+def metrics_view(request):
+    """Metrics for staff users and scrapers sending METRICS_TOKEN.
+
+    A front proxy makes every request come from the same address, so the
+    address can't tell a scraper apart.
+    """
+    if not has_metrics_access(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4"
+    )
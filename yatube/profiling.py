@@ -0,0 +1,76 @@
+import cProfile
+import os
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+SALT = "yatube.profiling"
+
+
+def profile_token():
+    """A value for the PROFILE_HEADER header that profiles a request."""
+    return signing.TimestampSigner(salt=SALT).sign("profile")
+
+
+def has_valid_token(request):
+    token = request.META.get(settings.PROFILE_HEADER)
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def profile_path(view):
+    """Where to write a profile of ``view``: one directory per URL name."""
+    directory = os.path.join(settings.PROFILE_DIR, view.replace(":", "."))
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.time():.6f}-{os.getpid()}-{uuid.uuid4().hex[:8]}.prof"
+    return os.path.join(directory, name)
+
+
+class ProfilingMiddleware:
+    """Profile a sample of requests with cProfile and save the stats.
+
+    A PROFILE_SAMPLE_RATE fraction of requests is profiled, plus every
+    request whose PROFILE_HEADER carries a token from profile_token().
+    With PROFILING off the middleware removes itself at startup, so it
+    costs nothing.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (
+            random.random() < settings.PROFILE_SAMPLE_RATE
+            or has_valid_token(request)
+        ):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.profiled(request)
+        finally:
+            profiler.disable()
+        match = request.resolver_match
+        profiler.dump_stats(
+            profile_path(match.view_name if match else "unresolved")
+        )
+        return response
+
+    def profiled(self, request):
+        # Entered after the profiler starts, so it is the one call without
+        # a recorded caller: the root of the stacks profile_report builds.
+        return self.get_response(request)
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     "users",
     "posts",
     "about",
+    "api",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -51,7 +52,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "yatube.metrics.MetricsMiddleware",
+    "yatube.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "posts.replica.ReplicaMiddleware",
+    "posts.page_cache.PageCacheMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -76,6 +81,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "yatube.context_processors.year",
+                "yatube.context_processors.feed_cache",
             ],
         },
     },
@@ -91,9 +97,42 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
-    }
+    },
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, "db.replica.sqlite3"),
+        "TEST": {"MIRROR": "default"},
+    },
 }
 
+# Safe requests read REPLICA_APPS from the replica, which sync_replica
+# copies from the primary every REPLICA_SYNC_INTERVAL seconds. A replica
+# not synced for REPLICA_MAX_LAG seconds is not used.
+DATABASE_ROUTERS = ["posts.replica.ReplicaRouter"]
+REPLICA_DATABASE = "replica"
+REPLICA_APPS = ("posts", "auth")
+REPLICA_SYNC_INTERVAL = 5
+REPLICA_MAX_LAG = 30
+# Pages copied per backup step; -1 copies the whole file in one step.
+REPLICA_BACKUP_PAGES = -1
+
+# Applied to every new SQLite connection. WAL lets reads go on during a
+# write; the busy timeout makes writers wait for each other instead of
+# failing.
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "memory",
+    "busy_timeout": 5000,
+}
+
+# Write views are retried this many times while the database is locked,
+# starting after SQLITE_WRITE_BACKOFF seconds and doubling each time.
+SQLITE_WRITE_RETRIES = 5
+SQLITE_WRITE_BACKOFF = 0.05
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -117,6 +156,46 @@ INTERNAL_IPS = [
     "127.0.0.1",
 ]
 
+# Request metrics, served in Prometheus format at /metrics/ to staff users
+# and to scrapers sending "Authorization: Bearer <METRICS_TOKEN>". Each
+# process writes its counters to METRICS_DIR every METRICS_FLUSH_INTERVAL
+# seconds and the endpoint sums them; clear the directory when the server
+# is deployed.
+METRICS_TOKEN = os.environ.get("YATUBE_METRICS_TOKEN")
+METRICS_DIR = os.environ.get(
+    "YATUBE_METRICS_DIR", os.path.join(BASE_DIR, "metrics")
+)
+METRICS_FLUSH_INTERVAL = 1
+METRICS_LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+# Views over their @query_budget are logged; with QUERY_BUDGET_STRICT on,
+# as it is in tests, they raise instead.
+QUERY_BUDGET_STRICT = False
+
+# Opt-in request profiling: with PROFILING on, PROFILE_SAMPLE_RATE of
+# requests, and requests sending a profile_token() in PROFILE_HEADER, are
+# profiled with cProfile into PROFILE_DIR/<url name>/. profile_report
+# merges them.
+PROFILING = os.environ.get("YATUBE_PROFILING") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("YATUBE_PROFILE_SAMPLE_RATE", 0))
+PROFILE_HEADER = "HTTP_X_YATUBE_PROFILE"
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+PROFILE_DIR = os.environ.get(
+    "YATUBE_PROFILE_DIR", os.path.join(BASE_DIR, "profiles")
+)
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
 
@@ -151,10 +230,66 @@ LOGIN_REDIRECT_URL = "index"
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# One SQLite file shared by every worker process, so invalidations and
+# warm entries are seen by all of them.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "yatube.cache.SQLiteCache",
+        "LOCATION": os.environ.get(
+            "YATUBE_CACHE_LOCATION", os.path.join(BASE_DIR, "cache.sqlite3")
+        ),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
     }
 }
 
+TEST_RUNNER = "yatube.test_runner.TestRunner"
+
+# Feed fragments are invalidated by version bumps on writes, so they can
+# live for hours.
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 3
+
+# How long a shared cache may keep anonymous pages without revalidating.
+PAGE_CACHE_MAX_AGE = 60
+
+# Whole pages served to anonymous visitors, dropped by tag on writes.
+# PAGE_CACHE_TIMEOUT = 0 turns the cache off. With PAGE_CACHE_STATIC_ROOT
+# set, pages without a query string are also written there as
+# <path>/index.html and index.html.gz, for a front proxy to serve to
+# requests without a session cookie; they only go away on invalidation.
+PAGE_CACHE_TIMEOUT = 60 * 10
+PAGE_CACHE_STATIC_ROOT = os.environ.get("YATUBE_PAGE_CACHE_STATIC_ROOT")
+
 PER_PAGE = 10
+# Numbered pagination links to this many pages around the current one.
+PAGE_WINDOW = 5
+
+# Comments shown on a post page and fetched per "load more" click.
+COMMENTS_PER_PAGE = 20
+
+# Exports read EXPORT_CHUNK_SIZE rows per fetch and send the file in
+# blocks of about EXPORT_BLOCK_SIZE bytes.
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+# Timeline fan-out: the first batch is written inline, the rest in the
+# background worker unless TIMELINE_ASYNC is off. Posts by authors with at
+# least TIMELINE_CELEBRITY_THRESHOLD followers are pulled at read time.
+
+TIMELINE_BATCH_SIZE = 500
+TIMELINE_ASYNC = True
+TIMELINE_CELEBRITY_THRESHOLD = 10000
+
+# Post images are cropped to POST_IMAGE_ASPECT and saved as JPEG and WebP
+# variants for each width, served with srcset by the post_picture tag.
+# POST_THUMBNAILS is the sorl fallback for posts without variants. Both
+# are generated when PostForm saves an image so the first viewer doesn't
+# pay for it.
+
+POST_IMAGE_ASPECT = (960, 339)
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_QUALITY = 80
+POST_THUMBNAILS = [
+    ("960x339", {"crop": "center", "upscale": True}),
+]
+POST_THUMBNAILS_ASYNC = True
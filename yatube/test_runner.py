@@ -0,0 +1,40 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+def isolated_settings(directory):
+    """Settings every test run uses, with the cache kept in ``directory``.
+
+    The cache file and metrics are the test run's own, so tests start
+    clean and leave the development ones alone. Tests read
+    response.context, which a page from the page cache doesn't have; the
+    page cache tests turn it back on.
+    """
+    caches = {
+        alias: {**cache, "LOCATION": os.path.join(directory, f"{alias}.db")}
+        for alias, cache in settings.CACHES.items()
+    }
+    return override_settings(
+        CACHES=caches,
+        METRICS_DIR=os.path.join(directory, "metrics"),
+        QUERY_BUDGET_STRICT=True,
+        PAGE_CACHE_TIMEOUT=0,
+    )
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_directory = tempfile.mkdtemp()
+        self.test_settings = isolated_settings(self.cache_directory)
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -19,6 +19,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from .metrics import metrics_view
+
 handler404 = "posts.views.page_not_found"  # noqa
 handler500 = "posts.views.server_error"  # noqa
 
@@ -26,6 +28,8 @@ urlpatterns = [
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
     path("admin/", admin.site.urls),
+    path("api/v1/", include("api.urls", namespace="api")),
+    path("metrics/", metrics_view, name="metrics"),
     path("", include("posts.urls")),
     path("about/", include("about.urls", namespace="about")),
 ]